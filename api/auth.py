@@ -1,26 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config import settings
+from password_hashing import password_hasher
+from token_cache import token_cache, revocation_filter
 import uuid
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT Token
 security = HTTPBearer()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -55,8 +45,19 @@ def verify_token(token: str) -> dict:
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from JWT token"""
     token = credentials.credentials
-    payload = verify_token(token)
-    return payload
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        token_cache.put(token, payload)
+    
+    # Tokens issued for a session die with it (logout, reuse detection)
+    if await revocation_filter.is_revoked(payload.get("sid")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return dict(payload)
 
 def generate_user_id() -> str:
     """Generate unique user ID"""
@@ -64,18 +65,26 @@ def generate_user_id() -> str:
 
 class AuthManager:
     @staticmethod
-    def hash_password(password: str) -> str:
-        return get_password_hash(password)
+    async def hash_password(password: str) -> str:
+        return await password_hasher.hash(password)
+    
+    @staticmethod
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.verify(plain_password, hashed_password)
     
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return verify_password(plain_password, hashed_password)
+    async def verify_and_update_password(plain_password: str, hashed_password: str):
+        """Verify a password and return (valid, upgraded hash or None)"""
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
     
     @staticmethod
-    def create_token(user_id: str, email: str) -> str:
+    def create_token(user_id: str, email: str, session_id: Optional[str] = None) -> str:
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        data = {"sub": user_id, "email": email}
+        if session_id:
+            data["sid"] = session_id
         access_token = create_access_token(
-            data={"sub": user_id, "email": email}, 
+            data=data, 
             expires_delta=access_token_expires
         )
         return access_token
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark the embedding backends on our own documents
+
+For each backend (torch, onnx, onnx-int8) reports
+    - encode throughput at the embedding service's batch size
+    - p50/p99 latency of single-text encodes (the chat query path)
+    - process RSS after loading the model and peak RSS after encoding
+    - retrieval drift against the torch backend: recall@k of each
+      document-as-query nearest-neighbour search, and the mean cosine
+      between a backend's vectors and the torch vectors
+
+Documents come from the Chroma collections under CHROMA_PERSIST_DIRECTORY
+(knowledge base and user financial data), or from --texts-file with one
+text per line. Each backend runs in its own subprocess so RSS figures do
+not include the other backends.
+
+Usage:
+    python benchmarks/bench_embedders.py [--backends torch onnx onnx-int8] [--limit 2000] [--texts-file docs.txt]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the api directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config import settings
+from utils import percentile
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_documents(texts_file: str, limit: int):
+    if texts_file:
+        with open(texts_file) as f:
+            texts = [line.strip() for line in f if line.strip()]
+        return texts[:limit]
+
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    client = chromadb.PersistentClient(
+        path=settings.CHROMA_PERSIST_DIRECTORY,
+        settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    texts = []
+    for name in ("financial_knowledge", "user_financial_data"):
+        try:
+            collection = client.get_collection(name)
+        except Exception:
+            continue
+        texts.extend(collection.get(include=["documents"], limit=limit - len(texts))["documents"])
+        if len(texts) >= limit:
+            break
+    return [text for text in texts if text]
+
+
+def run_worker(backend: str, texts_path: str, output_path: str, batch_size: int, single_queries: int):
+    """Measure one backend in this process and save its embeddings"""
+    from embedders import create_embedder
+
+    with open(texts_path) as f:
+        texts = json.load(f)
+
+    baseline_rss = rss_mb()
+    started = time.perf_counter()
+    embedder = create_embedder(backend)
+    embedder.encode(texts[:1])  # first call initializes kernels
+    load_s = time.perf_counter() - started
+    loaded_rss = rss_mb()
+
+    started = time.perf_counter()
+    vectors = np.vstack([embedder.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+    encode_s = time.perf_counter() - started
+
+    single_ms = []
+    for text in texts[:single_queries]:
+        started = time.perf_counter()
+        embedder.encode([text])
+        single_ms.append((time.perf_counter() - started) * 1000)
+
+    np.save(output_path, vectors)
+    print(json.dumps({
+        "backend": backend,
+        "load_s": load_s,
+        "throughput": len(texts) / encode_s,
+        "single_p50_ms": percentile(single_ms, 50),
+        "single_p99_ms": percentile(single_ms, 99),
+        "model_rss_mb": loaded_rss - baseline_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def neighbours(vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--texts-file", help="One document per line (default: read from Chroma)")
+    parser.add_argument("--limit", type=int, default=2000, help="Maximum number of documents")
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_MAX_BATCH_SIZE)
+    parser.add_argument("--single-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--texts-path", help=argparse.SUPPRESS)
+    parser.add_argument("--output-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.texts_path, args.output_path, args.batch_size, args.single_queries)
+        return
+
+    texts = load_documents(args.texts_file, args.limit)
+    if len(texts) <= args.k:
+        sys.exit(f"Need more than {args.k} documents, found {len(texts)}")
+    print(f"{len(texts)} documents, batch size {args.batch_size}")
+
+    backends = list(dict.fromkeys(["torch"] + args.backends))
+    with tempfile.TemporaryDirectory() as workdir:
+        texts_path = os.path.join(workdir, "texts.json")
+        with open(texts_path, "w") as f:
+            json.dump(texts, f)
+
+        results, vectors = {}, {}
+        for backend in backends:
+            output_path = os.path.join(workdir, f"{backend}.npy")
+            completed = subprocess.run(
+                [sys.executable, __file__, "--worker", backend, "--texts-path", texts_path,
+                 "--output-path", output_path, "--batch-size", str(args.batch_size),
+                 "--single-queries", str(args.single_queries)],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(f"{backend:>10} | failed: {completed.stderr.strip().splitlines()[-1:]}")
+                continue
+            results[backend] = json.loads(completed.stdout.strip().splitlines()[-1])
+            vectors[backend] = np.load(output_path)
+
+    if "torch" not in vectors:
+        sys.exit("The torch baseline failed, cannot measure drift")
+    truth = neighbours(vectors["torch"], args.k)
+
+    for backend, result in results.items():
+        found = neighbours(vectors[backend], args.k)
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(truth, found)])
+        cosine = float(np.mean(np.sum(vectors[backend] * vectors["torch"], axis=1)))
+        print(
+            f"{backend:>10} | {result['throughput']:8.1f} texts/s | single p50 {result['single_p50_ms']:6.2f} ms"
+            f"  p99 {result['single_p99_ms']:6.2f} ms | model RSS {result['model_rss_mb']:7.1f} MB"
+            f"  peak {result['peak_rss_mb']:7.1f} MB | recall@{args.k} vs torch {recall:.3f}"
+            f"  mean cosine {cosine:.4f} | load {result['load_s']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
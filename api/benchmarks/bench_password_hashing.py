@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Latency of other endpoints during a login storm
+
+Serves a minimal in-process ASGI app with two routes and drives it through
+httpx: ``POST /login`` verifies a bcrypt password and ``GET /ping`` does
+no work, standing in for every other route sharing the worker. While
+--logins concurrent logins run, /ping is due every --probe-ms and its
+p50/p99/max latency (from the due time) is reported for
+    - inline: bcrypt verify called on the event loop (the old AuthManager path)
+    - pool:   PasswordHasher.verify on its bounded thread pool
+
+Usage:
+    python benchmarks/bench_password_hashing.py [--logins 50] [--rounds 12] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+# Add the api directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from password_hashing import PasswordHasher
+from utils import percentile
+
+PASSWORD = "correct horse battery staple"
+
+
+def build_app(hasher: PasswordHasher, stored_hash: str, inline: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if inline:
+            valid = hasher.context.verify(PASSWORD, stored_hash)
+        else:
+            valid = await hasher.verify(PASSWORD, stored_hash)
+        return {"valid": valid}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def storm(app: FastAPI, logins: int, probe_ms: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/ping")
+        done = asyncio.Event()
+        ping_ms = []
+
+        async def probe():
+            # Latency counts from when each probe was due, so time spent
+            # waiting for a blocked event loop is included
+            due = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                await client.get("/ping")
+                ping_ms.append((time.perf_counter() - due) * 1000)
+                due += probe_ms / 1000
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post("/login") for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    assert all(response.json()["valid"] for response in responses)
+    return elapsed, ping_ms
+
+
+async def baseline(app: FastAPI, samples: int = 50):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        ping_ms = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            await client.get("/ping")
+            ping_ms.append((time.perf_counter() - started) * 1000)
+    return ping_ms
+
+
+def report(name: str, ping_ms, elapsed=None, logins=None):
+    line = (
+        f"{name:>8} | /ping p50 {percentile(ping_ms, 50):8.2f} ms | p99 {percentile(ping_ms, 99):8.2f} ms"
+        f" | max {max(ping_ms):8.2f} ms | {len(ping_ms):4d} probes"
+    )
+    if elapsed is not None:
+        line += f" | {logins / elapsed:6.1f} logins/s"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--probe-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers, max_queue=args.logins)
+    stored_hash = hasher.context.hash(PASSWORD)
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {args.workers} hashing workers")
+
+    report("idle", asyncio.run(baseline(build_app(hasher, stored_hash, inline=False))))
+    for name, inline in (("inline", True), ("pool", False)):
+        elapsed, ping_ms = asyncio.run(storm(build_app(hasher, stored_hash, inline), args.logins, args.probe_ms))
+        report(name, ping_ms, elapsed, args.logins)
+    print(f"pool stats: {hasher.stats()}")
+    hasher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Serialization cost of list and analytics responses
+
+Builds synthetic Mongo documents (ObjectId ``_id``, datetime fields, the
+owner's user_id) shaped like the expense and goal records, and reports the
+p50/p99 time and body size per response for
+    - jsonable_encoder: str(_id) loop, fastapi.encoders.jsonable_encoder + json.dumps
+    - response_model:   str(_id) loop, TypeAdapter(List[dict]) validate + dump_json
+                        (FastAPI's path for a declared response_model)
+    - FastJSONResponse: documents as read with OWNER_PROJECTION, rendered by orjson
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 50 100 500] [--iterations 500]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+# Add the api directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from serialization import OWNER_PROJECTION, FastJSONResponse
+from utils import percentile
+
+CATEGORIES = ["food", "rent", "transport", "utilities", "entertainment", "shopping", "healthcare", "education", "other"]
+
+LIST_ADAPTER = TypeAdapter(List[dict])
+DICT_ADAPTER = TypeAdapter(dict)
+
+
+def expense_documents(count: int, rng: random.Random) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": "6650f0c2a1b2c3d4e5f60718",
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.uniform(50, 25000), 2),
+            "description": f"Payment {i} at merchant {rng.randint(1, 500)}",
+            "date": now - timedelta(days=rng.randint(0, 720)),
+            "payment_method": rng.choice(["upi", "card", "cash", None]),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def goal_progress_payload(count: int, rng: random.Random) -> dict:
+    now = datetime.utcnow()
+    return {"goals": [
+        {
+            "id": ObjectId(),
+            "title": f"Goal {i}",
+            "target_amount": 500000.0,
+            "current_amount": round(rng.uniform(0, 500000), 2),
+            "progress_percentage": rng.uniform(0, 100),
+            "days_remaining": rng.randint(1, 2000),
+            "required_monthly_savings": rng.uniform(0, 50000),
+            "target_date": now + timedelta(days=rng.randint(1, 2000)),
+            "on_track": rng.random() > 0.5,
+        }
+        for i in range(count)
+    ]}
+
+
+def stringify_ids(value):
+    """What the routes did before handing documents to FastAPI"""
+    if isinstance(value, list):
+        for item in value:
+            item["_id"] = str(item["_id"])
+    else:
+        for item in value["goals"]:
+            item["id"] = str(item["id"])
+    return value
+
+
+def project(documents: List[dict]) -> List[dict]:
+    """Documents as Mongo returns them with OWNER_PROJECTION"""
+    return [{k: v for k, v in doc.items() if OWNER_PROJECTION.get(k, 1)} for doc in documents]
+
+
+def run(name: str, payload_factory, serialize, iterations: int):
+    times_ms, size = [], 0
+    for _ in range(iterations):
+        payload = payload_factory()
+        started = time.perf_counter()
+        body = serialize(payload)
+        times_ms.append((time.perf_counter() - started) * 1000)
+        size = len(body)
+    print(f"  {name:>17} | p50 {percentile(times_ms, 50):7.3f} ms | p99 {percentile(times_ms, 99):7.3f} ms | {size / 1024:7.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 100, 500])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    fast = FastJSONResponse(None)
+
+    for rows in args.rows:
+        documents = expense_documents(rows, rng)
+        goals = goal_progress_payload(min(rows, 50), rng)
+        copy_documents = lambda: [dict(doc) for doc in documents]
+        copy_goals = lambda: {"goals": [dict(goal) for goal in goals["goals"]]}
+
+        print(f"GET /finance/expenses, {rows} rows")
+        run("jsonable_encoder", copy_documents,
+            lambda p: json.dumps(jsonable_encoder(stringify_ids(p))).encode(), args.iterations)
+        run("response_model", copy_documents,
+            lambda p: LIST_ADAPTER.dump_json(LIST_ADAPTER.validate_python(stringify_ids(p))), args.iterations)
+        run("FastJSONResponse", lambda: project(documents), fast.render, args.iterations)
+
+        print(f"GET /analytics/goal-progress, {len(goals['goals'])} goals")
+        run("jsonable_encoder", copy_goals,
+            lambda p: json.dumps(jsonable_encoder(stringify_ids(p))).encode(), args.iterations)
+        run("response_model", copy_goals,
+            lambda p: DICT_ADAPTER.dump_json(DICT_ADAPTER.validate_python(stringify_ids(p))), args.iterations)
+        run("FastJSONResponse", copy_goals, fast.render, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
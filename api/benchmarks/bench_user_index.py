@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-user in-memory index against a filtered Chroma query
+
+Builds a synthetic user_financial_data collection for a growing number of
+users and, for each size, compares the p50/p99 latency and recall@k of
+    - the current path: collection.query(where={"user_id": ...})
+    - UserVectorIndex.search (warm cache), plus its cold load time
+
+Recall is measured against exact brute-force top-k for the same user.
+
+Usage:
+    python benchmarks/bench_user_index.py [--users 10 100 1000] [--records 500] [--queries 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the api directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from user_index import UserVectorIndex
+from utils import percentile
+
+
+def build_collection(path: str, num_users: int, records_per_user: int, dim: int, rng):
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    client = chromadb.PersistentClient(path=path, settings=ChromaSettings(anonymized_telemetry=False))
+    collection = client.get_or_create_collection(name=f"bench_users_{num_users}")
+
+    batch = 5000
+    ids, embeddings, documents, metadatas = [], [], [], []
+    for user in range(num_users):
+        # MiniLM embeddings are unit length, so L2 and cosine rankings agree
+        vectors = rng.normal(size=(records_per_user, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for record in range(records_per_user):
+            ids.append(f"user{user}_{record}")
+            embeddings.append(vectors[record].tolist())
+            documents.append(f"Expense record {record} for user {user}")
+            metadatas.append({"user_id": f"user{user}", "data_type": "expense"})
+            if len(ids) >= batch:
+                collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                ids, embeddings, documents, metadatas = [], [], [], []
+    if ids:
+        collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+    return collection
+
+
+def exact_top_k(collection, user_id: str, query, k: int):
+    records = collection.get(where={"user_id": user_id}, include=["embeddings"])
+    matrix = np.asarray(records["embeddings"], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = matrix @ (query / np.linalg.norm(query))
+    return {records["ids"][i] for i in np.argsort(-scores)[:k]}
+
+
+def run(num_users: int, records_per_user: int, num_queries: int, k: int, dim: int):
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as path:
+        collection = build_collection(path, num_users, records_per_user, dim, rng)
+        index = UserVectorIndex(lambda: collection)
+
+        chroma_ms, index_ms, load_ms = [], [], []
+        chroma_recall, index_recall = [], []
+        for _ in range(num_queries):
+            user_id = f"user{rng.integers(num_users)}"
+            query = rng.normal(size=dim).astype(np.float32)
+            truth = exact_top_k(collection, user_id, query, k)
+
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, where={"user_id": user_id})
+            chroma_ms.append((time.perf_counter() - started) * 1000)
+            chroma_recall.append(len(truth & set(result["ids"][0])) / k)
+
+            started = time.perf_counter()
+            cold = user_id not in index._entries
+            hits = index.search(user_id, query, k)
+            elapsed = (time.perf_counter() - started) * 1000
+            (load_ms if cold else index_ms).append(elapsed)
+            index_recall.append(len(truth & {hit["id"] for hit in hits}) / k)
+
+        print(
+            f"{num_users:>6} users | chroma p50 {percentile(chroma_ms, 50):7.2f} ms  p99 {percentile(chroma_ms, 99):7.2f} ms"
+            f"  recall {np.mean(chroma_recall):.3f} | index p50 {percentile(index_ms, 50):7.2f} ms"
+            f"  p99 {percentile(index_ms, 99):7.2f} ms  recall {np.mean(index_recall):.3f}"
+            f"  cold load p50 {percentile(load_ms, 50):7.2f} ms | cached {index.stats()['bytes_cached'] / 1e6:.1f} MB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--records", type=int, default=500, help="Records per user")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    for num_users in args.users:
+        run(num_users, args.records, args.queries, args.k, args.dim)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Recall versus memory for the user vector storage modes
+
+Loads the stored user vectors (user_financial_data under
+CHROMA_PERSIST_DIRECTORY) and, for each storage setting, reports bytes per
+vector, the footprint for the whole corpus, recall@k against exact
+float32 search and per-query search time. Each stored vector is used as a
+query against the rest of the corpus, as a stand-in for real queries.
+
+Settings: float32 (baseline), float16, and pca<d> / pca<d>+float16 for
+each --dims value, with the projection fitted on the corpus the way
+`manage.py compress-vectors` fits it.
+
+Usage:
+    python benchmarks/bench_vector_compression.py [--dims 64 128 192] [--queries 500] [--k 5]
+    python benchmarks/bench_vector_compression.py --synthetic 20000   # no Chroma data needed
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the api directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config import settings
+from utils import percentile
+from vector_compression import SOURCE_USER_COLLECTION, PCAProjection
+
+
+def load_vectors(limit: int) -> np.ndarray:
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    client = chromadb.PersistentClient(
+        path=settings.CHROMA_PERSIST_DIRECTORY,
+        settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    collection = client.get_collection(SOURCE_USER_COLLECTION)
+    return np.asarray(collection.get(include=["embeddings"], limit=limit)["embeddings"], dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dim: int, rng) -> np.ndarray:
+    """Clustered unit vectors with a decaying spectrum, roughly like sentence embeddings"""
+    centers = rng.normal(size=(64, dim)) * np.linspace(1.0, 0.05, dim)
+    vectors = centers[rng.integers(64, size=count)] + rng.normal(scale=0.3, size=(count, dim)) * np.linspace(1.0, 0.05, dim)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, query_rows: np.ndarray, k: int):
+    """Top-k rows per query (excluding the query's own row) and per-query times"""
+    results, times_ms = [], []
+    for query, row in zip(queries, query_rows):
+        started = time.perf_counter()
+        scores = matrix.astype(np.float32, copy=False) @ query
+        scores[row] = -np.inf
+        top = np.argpartition(-scores, k)[:k]
+        times_ms.append((time.perf_counter() - started) * 1000)
+        results.append(set(top.tolist()))
+    return results, times_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 192])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100000, help="Maximum vectors loaded from Chroma")
+    parser.add_argument("--synthetic", type=int, help="Use this many synthetic 384-dim vectors instead of Chroma")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = synthetic_vectors(args.synthetic, 384, rng) if args.synthetic else load_vectors(args.limit)
+    count, dim = vectors.shape
+    if count <= args.k:
+        sys.exit(f"Need more than {args.k} vectors, found {count}")
+
+    query_rows = rng.choice(count, size=min(args.queries, count), replace=False)
+    truth, _ = top_k(vectors, vectors[query_rows], query_rows, args.k)
+    print(f"{count} vectors x {dim} dims, {len(query_rows)} queries, recall@{args.k} vs exact float32")
+
+    settings_to_test = [("float32", None, np.float32), ("float16", None, np.float16)]
+    for dims in args.dims:
+        if dims < dim:
+            settings_to_test.append((f"pca{dims}", dims, np.float32))
+            settings_to_test.append((f"pca{dims}+float16", dims, np.float16))
+
+    for name, dims, dtype in settings_to_test:
+        if dims:
+            projection = PCAProjection.fit(vectors, dims)
+            matrix = projection.transform(vectors).astype(dtype)
+            queries = projection.transform(vectors[query_rows])
+        else:
+            matrix = vectors.astype(dtype)
+            queries = vectors[query_rows]
+
+        found, times_ms = top_k(matrix, queries, query_rows, args.k)
+        recall = np.mean([len(a & b) / args.k for a, b in zip(truth, found)])
+        bytes_per_vector = matrix.shape[1] * matrix.itemsize
+        print(
+            f"{name:>16} | {bytes_per_vector:5d} B/vector | {matrix.nbytes / 1e6:8.1f} MB total"
+            f" ({matrix.nbytes / vectors.nbytes:5.1%}) | recall@{args.k} {recall:.3f}"
+            f" | search p50 {percentile(times_ms, 50):6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
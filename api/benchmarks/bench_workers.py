@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory per worker for the production launcher
+
+Starts `serve.py` for each --workers value (with and without model
+preloading), waits for the workers to warm up, drives --path with
+--concurrency parallel clients for --seconds and reports requests per
+second, p50/p99 latency and, per worker process, RSS next to PSS and USS
+from /proc/<pid>/smaps_rollup. Pages shared copy-on-write with the master
+(the preloaded model) count fully in every worker's RSS but are split
+between processes in PSS and left out of USS, so compare those columns.
+
+Needs the same environment as the API itself (MongoDB reachable); Linux
+only, for /proc.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1 2 4] [--path /health] [--seconds 20] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Add the api directory to the path
+API_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(API_DIR)
+
+from utils import percentile
+
+
+def memory_kb(pid: int):
+    """(RSS, PSS, USS) of a process in kB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields.get("Rss", 0), fields.get("Pss", 0), uss
+
+
+def worker_pids(master_pid: int):
+    """API worker processes forked by the launcher (the Chroma server excluded)"""
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as children:
+        pids = [int(pid) for pid in children.read().split()]
+    workers = []
+    for pid in pids:
+        with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+            if b"chroma" not in cmdline.read().split(b"\0")[0]:
+                workers.append(pid)
+    return workers
+
+
+def start_server(workers: int, port: int, preload: bool) -> subprocess.Popen:
+    env = dict(os.environ, SERVER_PRELOAD_MODEL="true" if preload else "false")
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 180
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"serve.py exited with code {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    process.terminate()
+    sys.exit("serve.py did not start within 180s")
+
+
+async def load(url: str, seconds: float, concurrency: int):
+    latencies_ms = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(latencies_ms) / elapsed, latencies_ms, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=float, default=30, help="Seconds to let workers load their models")
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.concurrency} clients for {args.seconds:.0f}s")
+    for workers in args.workers:
+        for preload in (False, True):
+            process = start_server(workers, args.port, preload)
+            try:
+                time.sleep(args.warmup)
+                rps, latencies_ms, errors = asyncio.run(
+                    load(f"http://127.0.0.1:{args.port}{args.path}", args.seconds, args.concurrency)
+                )
+                memory = [memory_kb(pid) for pid in worker_pids(process.pid)]
+                master_rss = memory_kb(process.pid)[0]
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait(timeout=60)
+
+            rss, pss, uss = (sum(column) / len(memory) / 1024 for column in zip(*memory))
+            print(
+                f"{workers} workers, preload {'on ' if preload else 'off'} | {rps:8.1f} req/s"
+                f" | p50 {percentile(latencies_ms, 50):7.1f} ms | p99 {percentile(latencies_ms, 99):7.1f} ms"
+                f" | per worker RSS {rss:6.0f} MB, PSS {pss:6.0f} MB, USS {uss:6.0f} MB"
+                f" | master RSS {master_rss / 1024:5.0f} MB | errors {errors}"
+            )
+
+
+if __name__ == "__main__":
+    main()
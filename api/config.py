@@ -15,14 +15,103 @@ class Settings:
     # JWT Settings
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    
+    # Verified access-token cache and revoked-session filter
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    REVOCATION_FILTER_CAPACITY: int = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+    REVOCATION_FILTER_ERROR_RATE: float = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+    REVOCATION_FILTER_REFRESH_SECONDS: float = float(os.getenv("REVOCATION_FILTER_REFRESH_SECONDS", "5"))
+    
+    # Password hashing (bcrypt cost; stored hashes with another cost are
+    # re-hashed on the next successful login)
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    
+    # LLM
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini")  # gemini, stub
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+    LLM_STUB_FIRST_TOKEN_DELAY_MS: float = float(os.getenv("LLM_STUB_FIRST_TOKEN_DELAY_MS", "0"))
+    LLM_STUB_TOKEN_DELAY_MS: float = float(os.getenv("LLM_STUB_TOKEN_DELAY_MS", "0"))
+    
+    # Per-user in-memory vector index (LRU, bounded by memory)
+    USER_INDEX_MAX_MB: float = float(os.getenv("USER_INDEX_MAX_MB", "256"))
+    
+    # User vector storage: float32, float16 (in-memory index) or pca
+    # (reduced dimensions, fitted with `manage.py compress-vectors`)
+    USER_VECTOR_STORAGE: str = os.getenv("USER_VECTOR_STORAGE", "float32")
+    USER_VECTOR_PCA_DIMS: int = int(os.getenv("USER_VECTOR_PCA_DIMS", "128"))
+    USER_VECTOR_PCA_PATH: str = os.getenv("USER_VECTOR_PCA_PATH", "./chroma_db/user_vectors_pca.npz")
+    
+    # Semantic chat response cache
+    RESPONSE_CACHE_MAX_MB: float = float(os.getenv("RESPONSE_CACHE_MAX_MB", "32"))
+    RESPONSE_CACHE_MAX_ENTRIES_PER_USER: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES_PER_USER", "50"))
+    RESPONSE_CACHE_SIMILARITY: float = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+    
+    # Shared answer cache for general (non-personal) questions
+    SHARED_ANSWER_CACHE_MAX_MB: float = float(os.getenv("SHARED_ANSWER_CACHE_MAX_MB", "16"))
+    SHARED_ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("SHARED_ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    SHARED_ANSWER_CACHE_SIMILARITY: float = float(os.getenv("SHARED_ANSWER_CACHE_SIMILARITY", "0.95"))
+    SHARED_ANSWER_PERSONAL_TAIL: bool = os.getenv("SHARED_ANSWER_PERSONAL_TAIL", "true").lower() == "true"
+    
+    # RAG context stage budgets (milliseconds)
+    RAG_USER_SEARCH_TIMEOUT_MS: float = float(os.getenv("RAG_USER_SEARCH_TIMEOUT_MS", "800"))
+    RAG_KNOWLEDGE_SEARCH_TIMEOUT_MS: float = float(os.getenv("RAG_KNOWLEDGE_SEARCH_TIMEOUT_MS", "800"))
+    RAG_FINANCIAL_SUMMARY_TIMEOUT_MS: float = float(os.getenv("RAG_FINANCIAL_SUMMARY_TIMEOUT_MS", "1500"))
+    
+    # Bulk finance imports
+    FINANCE_BULK_MAX_ITEMS: int = int(os.getenv("FINANCE_BULK_MAX_ITEMS", "5000"))
+    
+    # Streaming export (documents per Mongo cursor batch)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Bank statement imports
+    STATEMENT_IMPORT_MAX_MB: int = int(os.getenv("STATEMENT_IMPORT_MAX_MB", "200"))
+    STATEMENT_IMPORT_BATCH_SIZE: int = int(os.getenv("STATEMENT_IMPORT_BATCH_SIZE", "500"))
+    STATEMENT_IMPORT_DIR: str = os.getenv("STATEMENT_IMPORT_DIR", "./statement_imports")
     
     # Vector DB
     CHROMA_PERSIST_DIRECTORY: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+    # Chroma server (set by serve.py when running several workers; empty
+    # means an embedded PersistentClient on CHROMA_PERSIST_DIRECTORY)
+    CHROMA_SERVER_HOST: str = os.getenv("CHROMA_SERVER_HOST", "")
+    CHROMA_SERVER_PORT: int = int(os.getenv("CHROMA_SERVER_PORT", "8001"))
+    
+    # Embedding Service
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")  # torch, onnx, onnx-int8
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_ONNX_CACHE_DIR: str = os.getenv("EMBEDDING_ONNX_CACHE_DIR", "./onnx_models")
+    EMBEDDING_ONNX_THREADS: int = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+    EMBEDDING_MAX_BATCH_SIZE: int = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+    EMBEDDING_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "1"))
+    
+    # Write-behind vector indexing
+    VECTOR_INDEX_BATCH_SIZE: int = int(os.getenv("VECTOR_INDEX_BATCH_SIZE", "64"))
+    VECTOR_INDEX_POLL_INTERVAL_SECONDS: float = float(os.getenv("VECTOR_INDEX_POLL_INTERVAL_SECONDS", "2"))
+    VECTOR_INDEX_MAX_ATTEMPTS: int = int(os.getenv("VECTOR_INDEX_MAX_ATTEMPTS", "8"))
+    VECTOR_INDEX_CLAIM_TIMEOUT_SECONDS: float = float(os.getenv("VECTOR_INDEX_CLAIM_TIMEOUT_SECONDS", "300"))
+    # Whether this process drains the outbox and writes the knowledge base;
+    # the other workers follow its writes through the index change feed
+    VECTOR_INDEX_WRITER: bool = os.getenv("VECTOR_INDEX_WRITER", "true").lower() == "true"
+    VECTOR_INDEX_FEED_INTERVAL_SECONDS: float = float(os.getenv("VECTOR_INDEX_FEED_INTERVAL_SECONDS", "1"))
     
     # API Settings
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     
+    # Production server (serve.py)
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "1"))
+    SERVER_PRELOAD_MODEL: bool = os.getenv("SERVER_PRELOAD_MODEL", "true").lower() == "true"
+    SERVER_TORCH_THREADS: int = int(os.getenv("SERVER_TORCH_THREADS", "0"))  # per worker; 0 = cores / workers
+    SERVER_LIMIT_CONCURRENCY: int = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0"))  # per worker; 0 = unlimited
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "0"))  # recycle a worker after N requests; 0 = never
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_TIMEOUT_KEEP_ALIVE: int = int(os.getenv("SERVER_TIMEOUT_KEEP_ALIVE", "5"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    
     # CORS
     CORS_ORIGINS: list = [
         "http://localhost:3000",
@@ -36,20 +36,45 @@ async def close_mongo_connection():
 async def create_indexes():
     """Create database indexes for better performance"""
     try:
-        if not mongodb.database:
+        if mongodb.database is None:
             return
             
         # Users collection indexes
         await mongodb.database.users.create_index("email", unique=True)
         await mongodb.database.users.create_index("user_id", unique=True)
         
-        # Financial data indexes
-        await mongodb.database.income.create_index([("user_id", 1), ("date", -1)])
-        await mongodb.database.expenses.create_index([("user_id", 1), ("date", -1)])
-        await mongodb.database.investments.create_index([("user_id", 1), ("date", -1)])
-        await mongodb.database.loans.create_index([("user_id", 1), ("date", -1)])
-        await mongodb.database.insurance.create_index([("user_id", 1), ("date", -1)])
-        await mongodb.database.budgets.create_index([("user_id", 1), ("month", -1)])
+        # Refresh-token sessions (expired ones are removed by the TTL index)
+        await mongodb.database.sessions.create_index("expires_at", expireAfterSeconds=0)
+        await mongodb.database.sessions.create_index([("user_id", 1), ("revoked_at", 1)])
+        await mongodb.database.sessions.create_index(
+            "revoked_at",
+            partialFilterExpression={"revoked_at": {"$type": "date"}}
+        )
+        
+        # Financial data indexes (sort key plus _id, matching keyset pagination)
+        await mongodb.database.income.create_index([("user_id", 1), ("date", -1), ("_id", -1)])
+        await mongodb.database.expenses.create_index([("user_id", 1), ("date", -1), ("_id", -1)])
+        await mongodb.database.expenses.create_index([("user_id", 1), ("category", 1), ("date", -1), ("_id", -1)])
+        await mongodb.database.investments.create_index([("user_id", 1), ("date", -1), ("_id", -1)])
+        await mongodb.database.investments.create_index([("user_id", 1), ("type", 1), ("date", -1), ("_id", -1)])
+        await mongodb.database.loans.create_index([("user_id", 1), ("start_date", -1), ("_id", -1)])
+        await mongodb.database.insurance.create_index([("user_id", 1), ("start_date", -1), ("_id", -1)])
+        await mongodb.database.budgets.create_index([("user_id", 1), ("month", -1), ("_id", -1)])
+        await mongodb.database.goals.create_index([("user_id", 1), ("target_date", 1), ("_id", 1)])
+        
+        # Monthly rollups (one document per user, kind, month and category)
+        await mongodb.database.monthly_rollups.create_index(
+            [("user_id", 1), ("kind", 1), ("month", 1), ("category", 1)],
+            unique=True
+        )
+        
+        # Vector indexing outbox
+        await mongodb.database.vector_outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+        await mongodb.database.vector_outbox.create_index([("created_at", 1)])
+        await mongodb.database.vector_outbox.create_index("claimed_by", sparse=True)
+        await mongodb.database.vector_outbox.create_index([("record_id", 1), ("created_at", 1)])
+        await mongodb.database.vector_index_changes.create_index("updated_at", expireAfterSeconds=86400)
+        await mongodb.database.import_jobs.create_index([("user_id", 1), ("created_at", -1)])
         
         print("📊 Database indexes created successfully!")
         
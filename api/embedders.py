@@ -0,0 +1,138 @@
+"""
+Sentence embedding backends (PyTorch, ONNX Runtime, int8-quantized ONNX)
+"""
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(ABC):
+    """Base class for embedding backends.
+
+    Backends implement ``encode``, returning one L2-normalized float32 row
+    per text, so vectors from different backends are comparable.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as an (n, dims) float32 array"""
+
+
+class TorchEmbedder(Embedder):
+    """The sentence-transformers model running in PyTorch on CPU"""
+
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+class OnnxEmbedder(Embedder):
+    """The same model exported to ONNX and run with ONNX Runtime.
+
+    Uses the ONNX export published with the model on the Hugging Face hub
+    and reproduces the sentence-transformers pipeline (mean pooling over
+    the attention mask, then L2 normalization). With ``quantized`` the
+    export is dynamically quantized to int8 weights once and cached under
+    ``cache_dir``.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, cache_dir: str, quantized: bool = False, max_length: int = 256, threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("The ONNX embedding backends need onnxruntime installed") from e
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+
+        if quantized:
+            self.name = "onnx-int8"
+        self.max_length = max_length
+
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model_path = hf_hub_download(model_name, "onnx/model.onnx")
+        if quantized:
+            model_path = self._quantize(model_path, model_name, cache_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self._session.get_inputs()}
+
+    @staticmethod
+    def _quantize(model_path: str, model_name: str, cache_dir: str) -> str:
+        """Dynamically quantize the export to int8 weights (cached)"""
+        target_dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+        target = os.path.join(target_dir, "model_int8.onnx")
+        if os.path.exists(target):
+            return target
+
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            raise RuntimeError("The onnx-int8 embedding backend needs the onnx package installed") from e
+
+        os.makedirs(target_dir, exist_ok=True)
+        started = time.perf_counter()
+        partial = target + ".tmp"
+        quantize_dynamic(model_path, partial, weight_type=QuantType.QInt8)
+        os.replace(partial, target)
+        logger.info(f"Quantized {model_name} to int8 in {time.perf_counter() - started:.1f}s: {target}")
+        return target
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        tokens = self._tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        inputs = {name: tokens[name].astype(np.int64) for name in self._input_names if name in tokens}
+        if "token_type_ids" in self._input_names and "token_type_ids" not in inputs:
+            inputs["token_type_ids"] = np.zeros_like(tokens["input_ids"], dtype=np.int64)
+
+        hidden = self._session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def create_embedder(backend: str = None) -> Embedder:
+    """Create the embedding backend selected by settings.EMBEDDING_BACKEND"""
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+    if backend == "torch":
+        return TorchEmbedder(settings.EMBEDDING_MODEL)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbedder(
+            settings.EMBEDDING_MODEL,
+            cache_dir=settings.EMBEDDING_ONNX_CACHE_DIR,
+            quantized=backend == "onnx-int8",
+            threads=settings.EMBEDDING_ONNX_THREADS
+        )
+    raise ValueError(f"Unknown embedding backend: {backend}")
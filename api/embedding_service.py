@@ -0,0 +1,189 @@
+"""
+Micro-batching embedding service for the RAG system
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """Batch concurrent encode requests and run them on a worker thread pool.
+
+    Callers await ``encode``/``encode_many`` and get their own vectors back.
+    Requests arriving within ``max_wait_ms`` of each other (up to
+    ``max_batch_size`` texts) are encoded together in a single model call,
+    so the event loop never runs the model itself.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], Any],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_workers: int = 1,
+    ):
+        self._encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_workers = max(1, max_workers)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: set = set()
+
+        # Stats
+        self._started_at = time.monotonic()
+        self._texts_encoded = 0
+        self._batches_run = 0
+        self._errors = 0
+        self._encode_seconds = 0.0
+        self._recent_batches = deque(maxlen=256)  # (finished_at, batch_size)
+
+    def _ensure_started(self):
+        """Start the batching loop on the running event loop (lazily)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker_task and not self._worker_task.done():
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="embedding"
+            )
+
+        # A new event loop (e.g. a script calling asyncio.run twice) needs its own queue
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._in_flight = set()
+        self._worker_task = loop.create_task(self._run())
+
+    async def encode(self, text: str) -> List[float]:
+        """Encode a single text, batched with any concurrent requests"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def encode_many(self, texts: Sequence[str]) -> List[List[float]]:
+        """Encode several texts; they share batches with concurrent callers"""
+        if not texts:
+            return []
+        self._ensure_started()
+        futures = []
+        for text in texts:
+            future = self._loop.create_future()
+            futures.append(future)
+            self._queue.put_nowait((text, future))
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self):
+        """Collect queued requests into batches and dispatch them to the pool"""
+        while True:
+            text, future = await self._queue.get()
+            batch = [(text, future)]
+            deadline = self._loop.time() + self.max_wait
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - self._loop.time()
+                    if timeout <= 0:
+                        # Still drain anything that is already waiting
+                        try:
+                            batch.append(self._queue.get_nowait())
+                            continue
+                        except asyncio.QueueEmpty:
+                            break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                # Closing: requests taken off the queue were never dispatched
+                self._fail_pending(batch)
+                raise
+            task = self._loop.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        """Encode one batch on the executor and resolve each caller's future"""
+        texts = [text for text, _ in batch]
+        started = time.perf_counter()
+        try:
+            vectors = await self._loop.run_in_executor(self._executor, self._encode_batch, texts)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector.tolist() if hasattr(vector, "tolist") else list(vector))
+            self._texts_encoded += len(batch)
+            self._batches_run += 1
+            self._recent_batches.append((time.monotonic(), len(batch)))
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Error encoding embedding batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._encode_seconds += time.perf_counter() - started
+            self._slots.release()
+
+    @staticmethod
+    def _fail_pending(batch):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding service is shut down"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput and queue-depth stats for sizing the service"""
+        now = time.monotonic()
+        window = [size for finished, size in self._recent_batches if now - finished <= 60]
+        window_seconds = max(min(60.0, now - self._started_at), 1e-9)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "batches_in_flight": len(self._in_flight),
+            "texts_encoded": self._texts_encoded,
+            "batches_run": self._batches_run,
+            "errors": self._errors,
+            "avg_batch_size": round(self._texts_encoded / self._batches_run, 2) if self._batches_run else 0,
+            "avg_batch_ms": round(self._encode_seconds / self._batches_run * 1000, 2) if self._batches_run else 0,
+            "texts_per_second_last_minute": round(sum(window) / window_seconds, 2),
+            "texts_per_second_overall": round(self._texts_encoded / max(now - self._started_at, 1e-9), 2),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_workers": self.max_workers,
+        }
+
+    async def close(self):
+        """Stop the batching loop and shut the worker pool down.
+
+        Requests not yet dispatched fail with RuntimeError; batches already
+        encoding are allowed to finish.
+        """
+        if self._worker_task:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        # Fail requests still waiting in the queue instead of leaving their callers hanging
+        pending = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail_pending(pending)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
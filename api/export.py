@@ -0,0 +1,87 @@
+"""
+Streaming export of a user's financial records as NDJSON or CSV
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+from serialization import OWNER_PROJECTION
+
+# Bytes buffered before a chunk is flushed to the client
+FLUSH_BYTES = 64 * 1024
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (datetime, date, ObjectId, Enum)):
+        return _json_default(value)
+    return value
+
+
+def csv_columns(sources: List[Tuple[str, str, Type[BaseModel]]]) -> List[str]:
+    """Header covering every selected record type (known up front from the models)"""
+    columns = ["record_type", "_id"]
+    for _, _, model in sources:
+        for field in model.model_fields:
+            if field not in columns:
+                columns.append(field)
+    columns.append("created_at")
+    return columns
+
+
+async def _records(db, user_id: str, sources, batch_size: int) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    for record_type, collection_name, _ in sources:
+        cursor = getattr(db, collection_name).find(
+            {"user_id": user_id}, OWNER_PROJECTION
+        ).sort("_id", 1).batch_size(batch_size)
+        async for record in cursor:
+            yield record_type, record
+
+
+async def stream_export(db, user_id: str, sources, fmt: str = "ndjson", batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """Yield the user's records in chunks of about FLUSH_BYTES.
+
+    ``sources`` lists (record type, collection name, create model). Records
+    are read from server-side cursor batches and written out as they
+    arrive, so memory use does not grow with the size of the history.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        columns = csv_columns(sources)
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+
+    async for record_type, record in _records(db, user_id, sources, batch_size):
+        if writer is not None:
+            writer.writerow({"record_type": record_type, **{key: _csv_value(value) for key, value in record.items()}})
+        else:
+            buffer.write(json.dumps({"record_type": record_type, **record}, default=_json_default))
+            buffer.write("\n")
+
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,507 @@
+"""
+Write-behind vector indexing through a durable MongoDB outbox
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import DeleteMany, UpdateOne
+
+from config import settings
+from rag_system import SHARED_ANSWER_SCOPE, vector_store
+from response_cache import response_cache, shared_answer_cache
+from utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndexQueue:
+    """Outbox of pending vector-store writes, drained by a background worker.
+
+    Finance write handlers append an entry to the ``vector_outbox``
+    collection and return. The worker claims pending entries in batches,
+    embeds them with one batched encode, writes them to Chroma with one
+    upsert and deletes them from the outbox. A failed batch write is
+    retried entry by entry; failed entries are retried with exponential
+    backoff, and entries that keep failing are marked as
+    failed and left in the outbox for inspection.
+    """
+
+    # Outbox order: enqueue time, then insertion order within one insert
+    ORDER = [("created_at", 1), ("_id", 1)]
+
+    def __init__(
+        self,
+        vector_store,
+        batch_size: int = 64,
+        poll_interval: float = 2.0,
+        max_attempts: int = 8,
+        claim_timeout: float = 300.0,
+    ):
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        # Stats
+        self._indexed = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._lag_ms = deque(maxlen=500)
+        self._last_error: Optional[str] = None
+
+    async def enqueue(
+        self,
+        db,
+        user_id: str,
+        data_type: str,
+        data: Optional[Dict[str, Any]],
+        record_id: Any = None,
+        op: str = "upsert",
+    ):
+        """Append a vector-store write (upsert or delete of a record) to the outbox"""
+        await self.enqueue_many(db, [{
+            "user_id": user_id,
+            "data_type": data_type,
+            "data": data,
+            "record_id": record_id,
+            "op": op,
+        }])
+
+    async def enqueue_many(self, db, entries: List[Dict[str, Any]]):
+        """Append several vector-store writes to the outbox in one insert"""
+        if not entries:
+            return
+        now = datetime.utcnow()
+        await db.vector_outbox.insert_many([
+            {
+                **entry,
+                "status": "pending",
+                "attempts": 0,
+                "created_at": now,
+                "next_attempt_at": now,
+            }
+            for entry in entries
+        ], ordered=False)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self, db):
+        """Start the background worker on the running event loop"""
+        if self._task and not self._task.done():
+            return
+        self._db = db
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Vector indexing worker started ({self.worker_id})")
+
+    async def stop(self):
+        """Stop the background worker"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.drain_once(self._db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Vector indexing worker error: {e}")
+                processed = 0
+
+            if processed == 0:
+                # Idle: sleep until new entries arrive or the poll interval passes
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _claim_batch(self, db) -> List[Dict[str, Any]]:
+        """Claim up to batch_size due entries for this worker"""
+        now = datetime.utcnow()
+        due_filter = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            # Entries claimed by a worker that died mid-batch
+            {"status": "processing", "claimed_at": {"$lt": now - timedelta(seconds=self.claim_timeout)}},
+        ]}
+        due = await db.vector_outbox.find(due_filter, {"_id": 1}).sort(self.ORDER).limit(
+            self.batch_size
+        ).to_list(self.batch_size)
+        if not due:
+            return []
+
+        # Only entries still due when the update runs are claimed, so two
+        # workers never index the same entry
+        claim_token = f"{self.worker_id}:{time.monotonic_ns()}"
+        await db.vector_outbox.update_many(
+            {"_id": {"$in": [entry["_id"] for entry in due]}, **due_filter},
+            {"$set": {"status": "processing", "claimed_by": claim_token, "claimed_at": now}}
+        )
+        return await db.vector_outbox.find({"claimed_by": claim_token}).sort(self.ORDER).to_list(None)
+
+    async def drain_once(self, db) -> int:
+        """Index one batch from the outbox; returns the number of entries handled"""
+        batch = await self._claim_batch(db)
+        if not batch:
+            return 0
+
+        # Only the latest queued operation per vector matters (entries are
+        # claimed oldest first)
+        latest: Dict[str, Dict[str, Any]] = {}
+        for entry in batch:
+            latest[self._vector_id(entry)] = entry
+        upserts = [(doc_id, entry) for doc_id, entry in latest.items() if entry.get("op", "upsert") == "upsert"]
+        deletes = [(doc_id, entry) for doc_id, entry in latest.items() if entry.get("op") == "delete"]
+
+        errors = await self._apply(upserts, deletes)
+        failed = [entry for entry in batch if self._vector_id(entry) in errors]
+        if failed:
+            await self._handle_failure(db, failed, errors)
+        done = [entry for entry in batch if self._vector_id(entry) not in errors]
+        if not done:
+            return len(batch)
+
+        await db.vector_outbox.delete_many({"_id": {"$in": [entry["_id"] for entry in done]}})
+        await self._drop_superseded(db, [entry for doc_id, entry in latest.items() if doc_id not in errors])
+        user_ids = {entry["user_id"] for entry in done}
+        await publish_index_changes(db, user_ids)
+        # Answers cached between the finance write and now were built from
+        # the old vectors (other workers do the same through the change feed)
+        for user_id in user_ids:
+            response_cache.bump_version(user_id)
+
+        now = datetime.utcnow()
+        for entry in done:
+            self._lag_ms.append((now - entry["created_at"]).total_seconds() * 1000)
+        self._indexed += len(done)
+        self._batches += 1
+        return len(batch)
+
+    async def _drop_superseded(self, db, applied: List[Dict[str, Any]]):
+        """Remove older outbox entries for vectors whose newer operation was applied.
+
+        An older entry still in the outbox (waiting for a retry, or failed)
+        would otherwise undo the newer write when it runs, e.g. bring back
+        a deleted vector.
+        """
+        operations = [
+            DeleteMany({
+                "record_id": entry["record_id"],
+                "$or": [
+                    {"created_at": {"$lt": entry["created_at"]}},
+                    {"created_at": entry["created_at"], "_id": {"$lt": entry["_id"]}},
+                ],
+            })
+            for entry in applied
+            if entry.get("record_id") is not None
+        ]
+        if operations:
+            await db.vector_outbox.bulk_write(operations, ordered=False)
+
+    async def _apply(self, upserts, deletes) -> Dict[str, Exception]:
+        """Write upserts and deletes to the vector store; returns errors by vector ID.
+
+        A failed batch write is retried one entry at a time, so a single bad
+        document only fails itself.
+        """
+        errors: Dict[str, Exception] = {}
+        for write, items in ((self._write_upserts, upserts), (self._write_deletes, deletes)):
+            if not items:
+                continue
+            try:
+                await write(items)
+                continue
+            except Exception as e:
+                if len(items) == 1:
+                    errors[items[0][0]] = e
+                    continue
+                logger.warning(f"Vector write of {len(items)} entries failed ({e}), retrying one by one")
+            for item in items:
+                try:
+                    await write([item])
+                except Exception as e:
+                    errors[item[0]] = e
+        return errors
+
+    async def _write_upserts(self, upserts):
+        await self.vector_store.add_user_data_batch([
+            {
+                "doc_id": doc_id,
+                "user_id": entry["user_id"],
+                "data_type": entry["data_type"],
+                "record_id": str(entry["record_id"]) if entry.get("record_id") else "",
+                "data": entry["data"],
+            }
+            for doc_id, entry in upserts
+        ])
+
+    async def _write_deletes(self, deletes):
+        await self.vector_store.delete_user_data(
+            [doc_id for doc_id, _ in deletes],
+            user_ids=[entry["user_id"] for _, entry in deletes]
+        )
+
+    @staticmethod
+    def _vector_id(entry: Dict[str, Any]) -> str:
+        """Vectors are keyed by the Mongo _id of the record they index"""
+        if entry.get("record_id") is not None:
+            return str(entry["record_id"])
+        return f"{entry['user_id']}_{entry['data_type']}_{entry['_id']}"
+
+    async def _handle_failure(self, db, entries: List[Dict[str, Any]], errors: Dict[str, Exception]):
+        """Schedule a retry with exponential backoff, or give up on the entry"""
+        self._failed_batches += 1
+        self._last_error = str(next(iter(errors.values())))
+        logger.error(f"Vector indexing failed for {len(entries)} entries: {self._last_error}")
+
+        now = datetime.utcnow()
+        for entry in entries:
+            error = str(errors[self._vector_id(entry)])
+            attempts = entry.get("attempts", 0) + 1
+            if attempts >= self.max_attempts:
+                update = {"status": "failed", "attempts": attempts, "last_error": error}
+            else:
+                update = {
+                    "status": "pending",
+                    "attempts": attempts,
+                    "last_error": error,
+                    "next_attempt_at": now + timedelta(seconds=min(2 ** attempts, 300)),
+                }
+            await db.vector_outbox.update_one(
+                {"_id": entry["_id"]},
+                {"$set": update, "$unset": {"claimed_by": "", "claimed_at": ""}}
+            )
+
+    async def stats(self, db) -> Dict[str, Any]:
+        """Outbox backlog and indexing lag metrics"""
+        pending, failed, oldest = await asyncio.gather(
+            db.vector_outbox.count_documents({"status": {"$in": ["pending", "processing"]}}),
+            db.vector_outbox.count_documents({"status": "failed"}),
+            db.vector_outbox.find_one(
+                {"status": {"$in": ["pending", "processing"]}},
+                {"created_at": 1},
+                sort=[("created_at", 1)]
+            )
+        )
+        oldest_age = (datetime.utcnow() - oldest["created_at"]).total_seconds() if oldest else 0
+        return {
+            "worker_running": bool(self._task and not self._task.done()),
+            "pending": pending,
+            "failed": failed,
+            "oldest_pending_seconds": round(oldest_age, 2),
+            "indexed": self._indexed,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "lag_ms_p50": round(percentile(self._lag_ms, 50), 2),
+            "lag_ms_p95": round(percentile(self._lag_ms, 95), 2),
+            "last_error": self._last_error,
+        }
+
+
+# Change-feed scope for knowledge-base writes (other scopes are user IDs)
+KNOWLEDGE_SCOPE = "__knowledge__"
+
+
+async def publish_index_changes(db, scopes: Iterable[str]):
+    """Record that the vectors of these users (or the knowledge base) changed"""
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne({"_id": scope}, {"$set": {"updated_at": now}}, upsert=True)
+        for scope in scopes
+    ]
+    if operations:
+        await db.vector_index_changes.bulk_write(operations, ordered=False)
+
+
+class IndexChangeFeed:
+    """Follows vector writes made by the writer process, in the other workers.
+
+    Only one process drains the outbox (VECTOR_INDEX_WRITER), so the other
+    workers' per-user indexes and cached answers would go stale. This polls
+    ``vector_index_changes`` and drops whatever a change touched: the user's
+    cached vectors and chat responses, or the knowledge lexical index and
+    shared answers.
+    """
+
+    def __init__(self, vector_store, poll_interval: float = 1.0):
+        self.vector_store = vector_store
+        self.poll_interval = poll_interval
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._since: Optional[datetime] = None
+        self._applied = 0
+
+    async def poll_once(self) -> int:
+        changes = await self._db.vector_index_changes.find(
+            {"updated_at": {"$gte": self._since}}
+        ).sort("updated_at", 1).to_list(None)
+        for change in changes:
+            scope = change["_id"]
+            if scope == KNOWLEDGE_SCOPE:
+                self.vector_store.reset_knowledge_lexical()
+                shared_answer_cache.bump_version(SHARED_ANSWER_SCOPE)
+            else:
+                self.vector_store.user_index.invalidate(scope)
+                response_cache.bump_version(scope)
+        if changes:
+            # $gte re-reads the last instant next time; applying a change twice is harmless
+            self._since = changes[-1]["updated_at"]
+            self._applied += len(changes)
+        return len(changes)
+
+    def start(self, db):
+        """Start following changes made from now on"""
+        if self._task and not self._task.done():
+            return
+        self._db = db
+        self._since = datetime.utcnow()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Following vector index changes from the writer process")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Index change feed error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "following": bool(self._task and not self._task.done()),
+            "changes_applied": self._applied,
+        }
+
+
+# Vector data_type -> Mongo collection holding the record
+DATA_TYPE_COLLECTIONS = {
+    "income": "income",
+    "expense": "expenses",
+    "investment": "investments",
+    "loan": "loans",
+    "insurance": "insurance",
+    "budget": "budgets",
+    "goal": "goals",
+}
+
+
+async def reconcile_user_vectors(db, vector_store, page_size: int = 1000, backfill: bool = False) -> Dict[str, int]:
+    """Remove vectors whose Mongo record no longer exists, in bulk.
+
+    Vectors that cannot be traced back to a record (legacy random IDs or
+    unknown data types) count as orphans too. With ``backfill``, records
+    that have no vector are queued for indexing afterwards.
+    """
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    from utils import prepare_document_for_vector_store
+
+    await vector_store.ensure_loaded(llm=False)
+    collection = vector_store.user_data_collection
+
+    scanned = 0
+    removed = 0
+    indexed_ids = set()
+    offset = 0
+    while True:
+        page = await asyncio.to_thread(collection.get, include=["metadatas"], limit=page_size, offset=offset)
+        page_ids = page["ids"]
+        if not page_ids:
+            break
+        scanned += len(page_ids)
+
+        # Group traceable vectors by the collection of their record
+        candidates: Dict[str, Dict[Any, str]] = {}
+        orphans = []
+        for doc_id, metadata in zip(page_ids, page["metadatas"] or [{}] * len(page_ids)):
+            collection_name = DATA_TYPE_COLLECTIONS.get((metadata or {}).get("data_type"))
+            try:
+                record_id = ObjectId(doc_id)
+            except (InvalidId, TypeError):
+                record_id = None
+            if collection_name is None or record_id is None:
+                orphans.append(doc_id)
+            else:
+                candidates.setdefault(collection_name, {})[record_id] = doc_id
+
+        for collection_name, by_record_id in candidates.items():
+            existing = await getattr(db, collection_name).find(
+                {"_id": {"$in": list(by_record_id)}}, {"_id": 1}
+            ).to_list(None)
+            existing_ids = {doc["_id"] for doc in existing}
+            for record_id, doc_id in by_record_id.items():
+                if record_id in existing_ids:
+                    indexed_ids.add(doc_id)
+                else:
+                    orphans.append(doc_id)
+
+        if orphans:
+            await vector_store.delete_user_data(orphans)
+            removed += len(orphans)
+        offset += len(page_ids) - len(orphans)
+
+    queued = 0
+    if backfill:
+        for data_type, collection_name in DATA_TYPE_COLLECTIONS.items():
+            entries = []
+            async for record in getattr(db, collection_name).find({}).batch_size(page_size):
+                if str(record["_id"]) in indexed_ids:
+                    continue
+                record_id = record.pop("_id")
+                entries.append({
+                    "user_id": record.get("user_id"),
+                    "data_type": data_type,
+                    "data": prepare_document_for_vector_store(record),
+                    "record_id": record_id,
+                    "op": "upsert",
+                })
+                if len(entries) >= page_size:
+                    await vector_index_queue.enqueue_many(db, entries)
+                    queued += len(entries)
+                    entries = []
+            if entries:
+                await vector_index_queue.enqueue_many(db, entries)
+                queued += len(entries)
+
+    logger.info(f"Vector reconciliation: scanned {scanned}, removed {removed} orphans, queued {queued} for indexing")
+    return {"scanned": scanned, "removed": removed, "queued": queued}
+
+
+# Initialize global instances
+vector_index_queue = VectorIndexQueue(
+    vector_store,
+    batch_size=settings.VECTOR_INDEX_BATCH_SIZE,
+    poll_interval=settings.VECTOR_INDEX_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.VECTOR_INDEX_MAX_ATTEMPTS,
+    claim_timeout=settings.VECTOR_INDEX_CLAIM_TIMEOUT_SECONDS,
+)
+index_change_feed = IndexChangeFeed(vector_store, poll_interval=settings.VECTOR_INDEX_FEED_INTERVAL_SECONDS)
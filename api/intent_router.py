@@ -0,0 +1,280 @@
+"""
+Structured-intent router that answers numeric finance questions from the database
+"""
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models import ExpenseCategory
+from rollups import get_monthly_rollups
+from summary import get_financial_snapshot
+from utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Phrases people use for each expense category
+CATEGORY_ALIASES = {
+    ExpenseCategory.FOOD.value: ["food", "groceries", "grocery", "dining", "eating out", "restaurants"],
+    ExpenseCategory.RENT.value: ["rent", "housing"],
+    ExpenseCategory.TRANSPORT.value: ["transport", "transportation", "travel", "commute", "fuel", "petrol"],
+    ExpenseCategory.UTILITIES.value: ["utilities", "utility", "bills", "electricity"],
+    ExpenseCategory.ENTERTAINMENT.value: ["entertainment", "movies", "subscriptions"],
+    ExpenseCategory.SHOPPING.value: ["shopping", "clothes"],
+    ExpenseCategory.HEALTHCARE.value: ["healthcare", "health", "medical", "medicine"],
+    ExpenseCategory.EDUCATION.value: ["education", "courses", "tuition"],
+}
+
+_CATEGORY_BY_ALIAS = {
+    alias: category
+    for category, aliases in CATEGORY_ALIASES.items()
+    for alias in aliases
+}
+
+_CATEGORY_PATTERN = "|".join(sorted((re.escape(alias) for alias in _CATEGORY_BY_ALIAS), key=len, reverse=True))
+
+_PERIOD_PATTERN = r"(?:in |for |during )?(?P<period>this month|last month|this year)?"
+
+# Questions asking for advice rather than numbers always go to the LLM
+_ADVICE_PATTERN = re.compile(r"\b(should|how can|how do|why|recommend|advice|suggest|improve|reduce|plan)\b")
+
+# Kinds of records a user keeps in the app
+_RECORD_NOUNS = (
+    r"(?:expenses?|expenditure|spending|income|salary|earnings|savings(?: rate)?|portfolio|investments?|"
+    r"holdings|sips?|loans?|emis?|debts?|budgets?|goals?|insurance|polic(?:y|ies)|premiums?|"
+    r"transactions?|accounts?|finances|financial (?:data|situation|position|health|summary|snapshot)|"
+    r"money|net worth|credit cards?|bills|emergency fund|cash ?flow|balance)"
+)
+
+# Wording that can only be answered from the asker's own records: their
+# records ("my expenses", "our home loan"), facts about them ("did I",
+# "I earn"), affordability, or a change relative to what they hold now
+_PERSONAL_PATTERN = re.compile(
+    rf"\b(?:(?:my|our) (?:[a-z-]+ ){{0,2}}{_RECORD_NOUNS}|"
+    r"(?:did|have|had|am|was|are|were) (?:i|we)|"
+    r"(?:i|we) (?:spent|spend|earn(?:ed)?|make|made|owe|have|had|paid|pay|own|saved|invested|hold)|"
+    r"i've|i'm|we've|we're|afford(?:able)?|for (?:me|us)|in my (?:case|situation)|"
+    r"which (?:loan|investment|policy|expense|goal|fund|card)s?)\b"
+)
+_ADJUSTMENT_PATTERN = re.compile(
+    r"\b(?:i|we)\b.*\b(?:more|less|increase|reduce|cut|stop|continue|switch|prepay|close|enough|on track)\b"
+)
+
+
+def classify_query(query: str) -> str:
+    """"personal" when answering needs the asker's own records, else "general".
+
+    Knowledge and advice questions that mention the asker only in passing
+    ("How much emergency fund do I need?", "Give me tax saving investment
+    recommendations") are answered from the knowledge base alone, so the
+    answer can be shared across users; the per-user snapshot tail is added
+    when serving it. Questions about the user's records, affordability or
+    changing what they hold ("Can I afford a home loan?", "Should I invest
+    more in stocks?") stay personal.
+    """
+    normalized = query.strip().lower()
+    if _PERSONAL_PATTERN.search(normalized) or _ADJUSTMENT_PATTERN.search(normalized):
+        return "personal"
+    return "general"
+
+@dataclass
+class Intent:
+    name: str
+    pattern: re.Pattern
+    handler: Callable[..., Awaitable[str]]
+
+
+def _period_range(period: Optional[str], today: date) -> Tuple[date, date, str]:
+    """Date range and label for a period phrase (defaults to this month)"""
+    if period == "last month":
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end, f"last month ({end:%B %Y})"
+    if period == "this year":
+        return today.replace(month=1, day=1), today, "this year"
+    return today.replace(day=1), today, "this month"
+
+
+def _money(amount: float) -> str:
+    return f"₹{amount:,.2f}"
+
+
+class IntentRouter:
+    """Answers structured questions (spend on a category, expense breakdown,
+    income, financial summary) with a direct query and a templated reply.
+
+    Questions that match no intent, or that ask for advice, return None
+    and fall back to full RAG. Hits are counted per intent.
+    """
+
+    def __init__(self):
+        self.intents: List[Intent] = [
+            Intent(
+                "category_spend",
+                re.compile(
+                    rf"^(?:how much|what) (?:did|have) i (?:spen[dt]|pay|paid) (?:on|for) "
+                    rf"(?P<category>{_CATEGORY_PATTERN}) ?{_PERIOD_PATTERN}$"
+                ),
+                self._category_spend
+            ),
+            Intent(
+                "expense_breakdown",
+                re.compile(
+                    rf"^(?:what(?:'s| is) my |show me my |show my |my )?"
+                    rf"(?:expense breakdown(?: by category)?|(?:top )?spending categories|expenses by category) ?"
+                    rf"{_PERIOD_PATTERN}$"
+                ),
+                self._expense_breakdown
+            ),
+            Intent(
+                "total_spend",
+                re.compile(
+                    rf"^(?:how much (?:did|have) i spen[dt](?: in total)?|what (?:are|were) my (?:total )?expenses) ?"
+                    rf"{_PERIOD_PATTERN}$"
+                ),
+                self._total_spend
+            ),
+            Intent(
+                "income_total",
+                re.compile(
+                    rf"^(?:how much (?:did|have) i (?:earn(?:ed)?|make|made)|what(?:'s| is| was) my (?:total )?income) ?"
+                    rf"{_PERIOD_PATTERN}$"
+                ),
+                self._income_total
+            ),
+            Intent(
+                "financial_summary",
+                re.compile(r"^(?:what(?:'s| is) my |show me my |give me my |my )?(?:current )?financial (?:summary|snapshot|overview)$"),
+                self._financial_summary
+            ),
+        ]
+
+        # Stats
+        self._hits: Dict[str, int] = {intent.name: 0 for intent in self.intents}
+        self._errors = 0
+        self._fallbacks = 0
+        self._latency_ms = deque(maxlen=500)
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", re.sub(r"[?!.]+$", "", query.strip().lower()))
+
+    def match(self, query: str) -> Optional[Tuple[Intent, Dict[str, Any]]]:
+        """The intent a query asks for and its parameters, if any"""
+        text = self._normalize(query)
+        if _ADVICE_PATTERN.search(text):
+            return None
+        for intent in self.intents:
+            found = intent.pattern.match(text)
+            if found:
+                return intent, {key: value for key, value in found.groupdict().items() if value}
+        return None
+
+    async def route(self, db, user_id: str, query: str) -> Optional[Dict[str, Any]]:
+        """Answer a structured question directly, or return None to use RAG"""
+        matched = self.match(query)
+        if matched is None:
+            self._fallbacks += 1
+            return None
+
+        intent, params = matched
+        started = time.perf_counter()
+        try:
+            response = await intent.handler(db, user_id, today=date.today(), **params)
+        except Exception as e:
+            logger.error(f"Error answering {intent.name} intent: {e}")
+            self._errors += 1
+            self._fallbacks += 1
+            return None
+
+        self._hits[intent.name] += 1
+        self._latency_ms.append((time.perf_counter() - started) * 1000)
+        return {"intent": intent.name, "response": response}
+
+    async def _category_spend(self, db, user_id: str, today: date, category: str, period: str = None) -> str:
+        category = _CATEGORY_BY_ALIAS[category]
+        start, end, label = _period_range(period, today)
+        rollups = await get_monthly_rollups(db, user_id, "expense", start, end)
+        buckets = [bucket for bucket in rollups if bucket["category"] == category]
+        total = sum(bucket["total"] for bucket in buckets)
+        count = sum(bucket["count"] for bucket in buckets)
+        if not count:
+            return f"You have no {category} expenses recorded for {label}."
+        return f"You spent {_money(total)} on {category} {label} across {count} transaction{'s' if count != 1 else ''}."
+
+    async def _expense_breakdown(self, db, user_id: str, today: date, period: str = None) -> str:
+        start, end, label = _period_range(period, today)
+        rollups = await get_monthly_rollups(db, user_id, "expense", start, end)
+        by_category: Dict[str, float] = {}
+        for bucket in rollups:
+            by_category[bucket["category"]] = by_category.get(bucket["category"], 0) + bucket["total"]
+        total = sum(by_category.values())
+        if not total:
+            return f"You have no expenses recorded for {label}."
+
+        lines = [f"Your expenses for {label} total {_money(total)}:"]
+        for category, amount in sorted(by_category.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"- {category.title()}: {_money(amount)} ({amount / total * 100:.1f}%)")
+        return "\n".join(lines)
+
+    async def _total_spend(self, db, user_id: str, today: date, period: str = None) -> str:
+        start, end, label = _period_range(period, today)
+        rollups = await get_monthly_rollups(db, user_id, "expense", start, end)
+        total = sum(bucket["total"] for bucket in rollups)
+        if not rollups:
+            return f"You have no expenses recorded for {label}."
+        return f"You spent {_money(total)} in total {label}."
+
+    async def _income_total(self, db, user_id: str, today: date, period: str = None) -> str:
+        start, end, label = _period_range(period, today)
+        rollups = await get_monthly_rollups(db, user_id, "income", start, end)
+        if not rollups:
+            return f"You have no income recorded for {label}."
+
+        by_source: Dict[str, float] = {}
+        for bucket in rollups:
+            by_source[bucket["category"]] = by_source.get(bucket["category"], 0) + bucket["total"]
+        total = sum(by_source.values())
+        lines = [f"Your income for {label} is {_money(total)}:"]
+        for source, amount in sorted(by_source.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"- {source.title()}: {_money(amount)}")
+        return "\n".join(lines)
+
+    async def _financial_summary(self, db, user_id: str, today: date) -> str:
+        snapshot = await get_financial_snapshot(db, user_id, today.replace(day=1), today)
+        income = snapshot["total_income"]
+        expenses = snapshot["total_expenses"]
+        savings_rate = (income - expenses) / income * 100 if income > 0 else 0
+        return "\n".join([
+            "Here is your financial summary for this month:",
+            f"- Income: {_money(income)}",
+            f"- Expenses: {_money(expenses)}",
+            f"- Cash flow: {_money(income - expenses)} (savings rate {savings_rate:.1f}%)",
+            f"- Investments: {_money(snapshot['total_investments'])} invested, "
+            f"currently worth {_money(snapshot['current_investment_value'])}",
+            f"- Loans outstanding: {_money(snapshot['total_loans'])}",
+            f"- Net worth: {_money(snapshot['current_investment_value'] - snapshot['total_loans'])}",
+        ])
+
+    def stats(self) -> Dict[str, Any]:
+        routed = sum(self._hits.values())
+        total = routed + self._fallbacks
+        return {
+            "routed": routed,
+            "fallbacks": self._fallbacks,
+            "errors": self._errors,
+            "hit_rate": round(routed / total, 4) if total else 0,
+            "hits_by_intent": dict(self._hits),
+            "hit_rate_by_intent": {
+                name: round(hits / total, 4) if total else 0
+                for name, hits in self._hits.items()
+            },
+            "latency_ms_p50": round(percentile(self._latency_ms, 50), 2),
+            "latency_ms_p95": round(percentile(self._latency_ms, 95), 2),
+        }
+
+
+# Initialize global instance
+intent_router = IntentRouter()
@@ -0,0 +1,99 @@
+"""
+In-process BM25 lexical index and reciprocal-rank fusion for hybrid retrieval
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no retrieval signal in finance questions
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "by", "can", "did", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "much", "my", "of", "on", "or", "should", "the",
+    "this", "to", "was", "what", "when", "which", "with", "you", "your",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens, so "80C" and "Section 80c" both match "80c" """
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index that supports incremental updates.
+
+    Adding, replacing or removing a document only touches that document's
+    postings, so it is cheap to keep in step with every write.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: str, text: str):
+        """Index a document, replacing any previous version with the same ID"""
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]):
+        for doc_id, text in documents:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Top documents by BM25 score (only documents sharing a query term)"""
+        num_docs = len(self._doc_terms)
+        if not num_docs:
+            return []
+        avg_length = self._total_length / num_docs or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                length = self._doc_lengths[doc_id]
+                norm = frequency + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / norm
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Merge ranked ID lists: score(d) = sum over lists of 1 / (k + rank(d))"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return fused[:limit] if limit is not None else fused
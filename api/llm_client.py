@@ -0,0 +1,144 @@
+"""
+Async LLM clients for the RAG system
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, AsyncIterator, Dict
+
+from config import settings
+from utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient(ABC):
+    """Base class for streaming LLM backends.
+
+    Backends implement ``_stream``; ``stream`` wraps it to record
+    time-to-first-token and total generation time.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._ttft_ms = deque(maxlen=500)
+        self._total_ms = deque(maxlen=500)
+        self._completed = 0
+        self._cancelled = 0
+        self._errors = 0
+
+    @abstractmethod
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response text for a prompt in chunks"""
+        yield ""  # pragma: no cover
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response text chunks as soon as the backend produces them"""
+        started = time.perf_counter()
+        first_token = True
+        stream = self._stream(prompt)
+        try:
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                if first_token:
+                    self._ttft_ms.append((time.perf_counter() - started) * 1000)
+                    first_token = False
+                yield chunk
+            self._completed += 1
+            self._total_ms.append((time.perf_counter() - started) * 1000)
+        except (asyncio.CancelledError, GeneratorExit):
+            self._cancelled += 1
+            raise
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            # Stop upstream generation if our consumer went away
+            await stream.aclose()
+
+    async def generate(self, prompt: str) -> str:
+        """Generate the full response text"""
+        chunks = []
+        async for chunk in self.stream(prompt):
+            chunks.append(chunk)
+        return "".join(chunks)
+
+    def stats(self) -> Dict[str, Any]:
+        """Time-to-first-token and completion latency stats"""
+        return {
+            "backend": self.name,
+            "completed": self._completed,
+            "cancelled": self._cancelled,
+            "errors": self._errors,
+            "ttft_ms_p50": round(percentile(self._ttft_ms, 50), 2),
+            "ttft_ms_p95": round(percentile(self._ttft_ms, 95), 2),
+            "total_ms_p50": round(percentile(self._total_ms, 50), 2),
+            "total_ms_p95": round(percentile(self._total_ms, 95), 2),
+        }
+
+
+class GeminiLLMClient(LLMClient):
+    """Google Gemini backend using the native async streaming API"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-1.5-flash"):
+        super().__init__()
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(model_name)
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata only)
+                continue
+            yield text
+
+
+class StubLLMClient(LLMClient):
+    """Deterministic local backend for tests and benchmarks.
+
+    Streams a canned answer derived from the prompt hash, one word at a
+    time, with configurable first-token and per-token delays.
+    """
+
+    name = "stub"
+
+    def __init__(self, first_token_delay_ms: float = 0, token_delay_ms: float = 0, response_words: int = 40):
+        super().__init__()
+        self.first_token_delay = first_token_delay_ms / 1000
+        self.token_delay = token_delay_ms / 1000
+        self.response_words = response_words
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        for index in range(self.response_words):
+            if index and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            word = digest[(index * 2) % len(digest):(index * 2) % len(digest) + 6]
+            yield ("Stub " if index == 0 else " ") + word
+
+
+def create_llm_client() -> LLMClient:
+    """Create the LLM backend selected by settings.LLM_BACKEND"""
+    backend = settings.LLM_BACKEND.lower()
+    if backend == "stub":
+        return StubLLMClient(
+            first_token_delay_ms=settings.LLM_STUB_FIRST_TOKEN_DELAY_MS,
+            token_delay_ms=settings.LLM_STUB_TOKEN_DELAY_MS
+        )
+    if backend == "gemini":
+        return GeminiLLMClient(settings.LLM_MODEL)
+    raise ValueError(f"Unknown LLM backend: {settings.LLM_BACKEND}")
@@ -4,6 +4,8 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 import logging
+import asyncio
+import os
 
 # Import configuration and database
 from config import settings
@@ -16,7 +18,15 @@ from routes.chat import router as chat_router
 from routes.analytics import router as analytics_router
 
 # Import RAG system
-from rag_system import finance_scraper
+from rag_system import vector_store, warm_up_rag_system
+from rollups import rebuild_rollups
+from pagination import NEXT_CURSOR_HEADER
+from indexing import KNOWLEDGE_SCOPE, index_change_feed, publish_index_changes, vector_index_queue
+from statement_import import statement_imports
+from intent_router import intent_router
+from response_cache import response_cache, shared_answer_cache
+from password_hashing import password_hasher
+from token_cache import token_cache, revocation_filter
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +35,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def warm_up_and_publish():
+    """Warm the RAG stack; the writer also ingests the knowledge base and
+    tells the other workers to rebuild their copy of its lexical index"""
+    await warm_up_rag_system(ingest_knowledge=settings.VECTOR_INDEX_WRITER)
+    if settings.VECTOR_INDEX_WRITER:
+        try:
+            await publish_index_changes(mongodb.database, [KNOWLEDGE_SCOPE])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not publish knowledge base change: {e}")
+
+async def backfill_rollups():
+    """Build the monthly rollups the first time they are needed (in the background)"""
+    try:
+        db = mongodb.database
+        if await db.monthly_rollups.estimated_document_count() == 0:
+            logger.info("📊 Building monthly rollups from existing transactions...")
+            await rebuild_rollups(db)
+    except Exception as rollup_error:
+        logger.warning(f"⚠️ Monthly rollup backfill failed: {rollup_error}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -34,12 +64,22 @@ async def lifespan(app: FastAPI):
     # Connect to MongoDB (required)
     await connect_to_mongo()
     
-    # Initialize RAG system with financial knowledge
-    logger.info("📚 Initializing RAG system with financial knowledge...")
-    try:
-        await finance_scraper.scrape_and_store_knowledge()
-    except Exception as rag_error:
-        logger.warning(f"⚠️ RAG system initialization failed: {rag_error}")
+    # One process writes to the vector store and backfills rollups; the
+    # others follow its changes
+    rollup_backfill_task = None
+    if settings.VECTOR_INDEX_WRITER:
+        vector_index_queue.start(mongodb.database)
+        rollup_backfill_task = asyncio.create_task(backfill_rollups())
+    else:
+        index_change_feed.start(mongodb.database)
+    
+    # Keep the revoked-session filter in sync with the sessions collection
+    revocation_filter.start(mongodb.database)
+    
+    # Warm up the RAG system (models, vector DB, knowledge base) in the
+    # background so the API starts accepting traffic immediately
+    logger.info("📚 Warming up RAG system in the background...")
+    rag_warmup_task = asyncio.create_task(warm_up_and_publish())
     
     logger.info("✅ Finance AI Assistant API started successfully!")
     
@@ -47,6 +87,15 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down Finance AI Assistant API...")
+    rag_warmup_task.cancel()
+    if rollup_backfill_task:
+        rollup_backfill_task.cancel()
+    await revocation_filter.stop()
+    await statement_imports.stop()
+    await vector_index_queue.stop()
+    await index_change_feed.stop()
+    await vector_store.embedding_service.close()
+    password_hasher.close()
     await close_mongo_connection()
     logger.info("👋 Finance AI Assistant API stopped")
 
@@ -99,6 +148,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -148,12 +198,39 @@ async def health_check():
         "services": {
             "api": "healthy",
             "database": db_status,
-            "vector_db": "available",
-            "ai_model": "ready"
+            "vector_db": vector_store.component_state["vector_db"],
+            "embedding_model": vector_store.component_state["embedding_model"],
+            "ai_model": vector_store.component_state["llm"],
+            "knowledge_base": vector_store.component_state["knowledge_base"]
         },
+        "embedding_service": vector_store.embedding_service.stats(),
+        "llm": vector_store.llm_stats(),
+        "rag_stages": vector_store.get_stage_stats(),
+        "intent_router": intent_router.stats(),
+        "password_hashing": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "revocation_filter": revocation_filter.stats(),
+        "response_cache": response_cache.stats(),
+        "shared_answer_cache": shared_answer_cache.stats(),
+        "user_index": vector_store.user_index.stats(),
+        "vector_indexing": await vector_index_queue.stats(mongodb.database) if db_status == "connected" else None,
+        "index_change_feed": index_change_feed.stats(),
+        "worker": {"pid": os.getpid(), "vector_index_writer": settings.VECTOR_INDEX_WRITER},
         "message": "All systems operational" if db_status == "connected" else "Database connection error"
     }
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Report whether each RAG component is warm"""
+    ready = vector_store.is_ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "components": dict(vector_store.component_state)
+        }
+    )
+
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -164,7 +241,8 @@ async def http_exception_handler(request, exc):
             "error": exc.detail,
             "status_code": exc.status_code,
             "timestamp": "2024-01-01T00:00:00Z"
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
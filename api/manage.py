@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the Finance AI API
+
+Usage:
+    python manage.py rebuild-rollups [--user-id USER_ID]
+    python manage.py reconcile-vectors [--backfill]
+    python manage.py compress-vectors [--dims 128]
+"""
+import argparse
+import asyncio
+import logging
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_rollups_command(args):
+    """Recompute monthly rollups from raw income and expense records"""
+    from rollups import rebuild_rollups
+    await rebuild_rollups(get_database(), args.user_id)
+
+
+async def reconcile_vectors_command(args):
+    """Remove vectors whose Mongo record is gone (and optionally index missing ones)"""
+    from indexing import reconcile_user_vectors
+    from rag_system import vector_store
+    await reconcile_user_vectors(get_database(), vector_store, backfill=args.backfill)
+
+
+async def compress_vectors_command(args):
+    """Fit a PCA projection and write reduced-dimension copies of the user vectors"""
+    from config import settings
+    from rag_system import vector_store
+    from vector_compression import compress_user_vectors
+    await compress_user_vectors(
+        vector_store,
+        dims=args.dims,
+        path=settings.USER_VECTOR_PCA_PATH,
+        sample_size=args.sample_size
+    )
+
+
+COMMANDS = {
+    "rebuild-rollups": rebuild_rollups_command,
+    "reconcile-vectors": reconcile_vectors_command,
+    "compress-vectors": compress_vectors_command,
+}
+
+
+async def run(args):
+    await connect_to_mongo()
+    try:
+        await COMMANDS[args.command](args)
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finance AI maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-rollups", help="Repair drift in the monthly_rollups collection")
+    rebuild.add_argument("--user-id", help="Only rebuild this user's rollups")
+
+    reconcile = subparsers.add_parser("reconcile-vectors", help="Remove orphaned vectors from user_financial_data")
+    reconcile.add_argument(
+        "--backfill",
+        action="store_true",
+        help="Also queue records that have no vector for indexing (the API's worker drains the queue)"
+    )
+
+    compress = subparsers.add_parser(
+        "compress-vectors",
+        help="Build the PCA-reduced user vector collection (then set USER_VECTOR_STORAGE=pca "
+             "and USER_VECTOR_PCA_DIMS, restart, and run reconcile-vectors --backfill)"
+    )
+    compress.add_argument("--dims", type=int, default=128, help="Reduced dimensionality")
+    compress.add_argument("--sample-size", type=int, default=20000, help="Vectors used to fit the projection")
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
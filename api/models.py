@@ -25,6 +25,9 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
 # Finance Data Models
 class IncomeSource(str, Enum):
     SALARY = "salary"
@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination for list endpoints
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Response header carrying the token for the next page (empty on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Any, record_id: ObjectId) -> str:
+    """Opaque token for the position just after (value, record_id)"""
+    if isinstance(value, datetime):
+        payload = {"d": value.isoformat(), "id": str(record_id)}
+    else:
+        payload = {"v": value, "id": str(record_id)}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Any, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError for malformed tokens"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        value = datetime.fromisoformat(payload["d"]) if "d" in payload else payload["v"]
+        return value, ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _after(field: str, direction: int, value: Any, record_id: ObjectId) -> Dict[str, Any]:
+    """Filter for documents after (value, record_id) in (field, _id) order.
+
+    Documents without the sort field sort before every value ascending and
+    after every value descending, as in MongoDB's own ordering.
+    """
+    newer, older = ("$gt", "$lt") if direction == 1 else ("$lt", "$gt")
+    if value is None:
+        ties = {field: None, "_id": {newer: record_id}}
+        if direction == 1:
+            return {"$or": [ties, {field: {"$ne": None}}]}
+        return ties
+
+    clauses = [{field: {newer: value}}, {field: value, "_id": {newer: record_id}}]
+    if direction == -1:
+        clauses.append({field: None})
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page in (sort_field, _id) order and the cursor for the next page.
+
+    With a cursor the page starts from an index seek, so every page costs
+    the same however deep it is. ``skip`` is still honoured for the first
+    request of clients that page by offset. A ``projection`` must keep
+    ``sort_field`` and ``_id``, which the next cursor is built from.
+    """
+    if cursor:
+        value, record_id = decode_cursor(cursor)
+        query = {"$and": [query, _after(sort_field, direction, value, record_id)]}
+        skip = 0
+
+    find = collection.find(query, projection).sort([(sort_field, direction), ("_id", direction)])
+    if skip:
+        find = find.skip(skip)
+    records = await find.limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    return records, next_cursor
@@ -0,0 +1,129 @@
+"""
+Password hashing on a bounded worker pool, off the event loop
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import settings
+from utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class PasswordHasher:
+    """Runs bcrypt hash/verify calls on a dedicated thread pool.
+
+    Each bcrypt call takes hundreds of milliseconds of CPU; on the event loop
+    a burst of logins would stall every other request in the worker. bcrypt
+    releases the GIL, so ``workers`` threads hash in parallel while the loop
+    keeps serving. At most ``max_queue`` calls may wait for a thread; beyond
+    that callers get PasswordHasherBusy instead of an unbounded backlog.
+
+    Hashes made with a cost other than ``rounds`` are reported as needing
+    an update by ``verify_and_update``, so raising (or lowering) the cost
+    upgrades each account on its next successful login.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_queue: int = 64):
+        self.rounds = rounds
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Stats
+        self._pending = 0
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._completed = 0
+        self._rejected = 0
+        self._upgraded = 0
+        self._wait_ms = deque(maxlen=500)
+        self._hash_ms = deque(maxlen=500)
+
+    async def _submit(self, func: Callable, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self._rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+        queued_at = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._running_lock:
+                self._running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._running_lock:
+                    self._running -= 1
+                self._wait_ms.append((started - queued_at) * 1000)
+                self._hash_ms.append((time.perf_counter() - started) * 1000)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; on success also return a new hash if the stored
+        one uses an outdated cost or scheme (None otherwise)"""
+        valid, new_hash = await self._submit(self.context.verify_and_update, password, hashed)
+        if valid and new_hash:
+            self._upgraded += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": max(0, self._pending - self._running),
+            "max_queue": self.max_queue,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "hashes_upgraded": self._upgraded,
+            "wait_ms_p50": round(percentile(self._wait_ms, 50), 2),
+            "wait_ms_p95": round(percentile(self._wait_ms, 95), 2),
+            "hash_ms_p50": round(percentile(self._hash_ms, 50), 2),
+        }
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Initialize global instance
+password_hasher = PasswordHasher(
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -1,13 +1,22 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
-from typing import List, Dict, Any
-import uuid
+from typing import List, Dict, Any, Optional
+import os
+import hashlib
+import threading
 from config import settings
+from utils import percentile
+from embedding_service import EmbeddingService
+from embedders import create_embedder
+from llm_client import create_llm_client
+from user_index import UserVectorIndex
+from vector_compression import PCAProjection, user_collection_name
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from intent_router import intent_router, classify_query
+from response_cache import response_cache, shared_answer_cache
 import json
 import httpx
 import asyncio
+import time
+from collections import deque
 from bs4 import BeautifulSoup
 import logging
 
@@ -15,68 +24,281 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Scope of the shared answer cache, versioned by knowledge-base changes
+SHARED_ANSWER_SCOPE = "knowledge"
+
 class VectorStore:
+    """RAG vector store whose heavy components load lazily.
+
+    Creating the instance is cheap: Chroma, the embedding model
+    and the LLM client are loaded on first use (in a worker thread) or by
+    ``warm_up`` running in the background after startup.
+    """
+    
+    COMPONENTS = ("vector_db", "embedding_model", "llm", "knowledge_base")
+    
     def __init__(self):
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_PERSIST_DIRECTORY,
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
+        self._client = None
+        self._user_data_collection = None
+        self._knowledge_collection = None
+        self._encoder = None
+        self._llm = None
+        self._load_lock = threading.Lock()
         
-        # Initialize collections
-        self.user_data_collection = self.client.get_or_create_collection(
-            name="user_financial_data",
-            metadata={"description": "User personal financial data"}
+        # Readiness of each component: cold, loading, ready or error
+        self.component_state: Dict[str, str] = {name: "cold" for name in self.COMPONENTS}
+        
+        # Batch concurrent encode calls off the event loop
+        self.embedding_service = EmbeddingService(
+            self._encode_batch,
+            max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+            max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+            max_workers=settings.EMBEDDING_WORKERS
         )
         
-        self.knowledge_collection = self.client.get_or_create_collection(
-            name="financial_knowledge",
-            metadata={"description": "Financial knowledge base"}
+        # Per-user in-memory index for exact search over a user's own records
+        self.user_index = UserVectorIndex(
+            lambda: self.user_data_collection,
+            max_bytes=int(settings.USER_INDEX_MAX_MB * 1024 * 1024),
+            dtype="float16" if settings.USER_VECTOR_STORAGE == "float16" else "float32"
         )
         
-        # Initialize sentence transformer
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        # Projection into the reduced user vector space (pca storage only)
+        self.user_projection = None
+        
+        # Lexical index over the knowledge base (built on first search)
+        self._knowledge_lexical = None
+        self._knowledge_docs: Dict[str, Dict[str, Any]] = {}
+        self._knowledge_lock = threading.Lock()
         
-        # Initialize Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # Per-stage latency stats for RAG context assembly
+        self.stage_stats: Dict[str, Dict[str, Any]] = {}
+    
+    def _load_vector_db(self):
+        """Open ChromaDB and its collections"""
+        with self._load_lock:
+            if self._client is not None:
+                return
+            self.component_state["vector_db"] = "loading"
+            try:
+                import chromadb
+                from chromadb.config import Settings as ChromaSettings
+                
+                if settings.CHROMA_SERVER_HOST:
+                    # Several API workers share one Chroma server that owns the directory
+                    client = chromadb.HttpClient(
+                        host=settings.CHROMA_SERVER_HOST,
+                        port=settings.CHROMA_SERVER_PORT,
+                        settings=ChromaSettings(anonymized_telemetry=False)
+                    )
+                else:
+                    client = chromadb.PersistentClient(
+                        path=settings.CHROMA_PERSIST_DIRECTORY,
+                        settings=ChromaSettings(anonymized_telemetry=False)
+                    )
+                
+                if settings.USER_VECTOR_STORAGE == "pca":
+                    if not os.path.exists(settings.USER_VECTOR_PCA_PATH):
+                        raise RuntimeError(
+                            f"USER_VECTOR_STORAGE=pca but {settings.USER_VECTOR_PCA_PATH} does not exist; "
+                            f"run `python manage.py compress-vectors` first"
+                        )
+                    self.user_projection = PCAProjection.load(settings.USER_VECTOR_PCA_PATH)
+                
+                self._user_data_collection = client.get_or_create_collection(
+                    name=user_collection_name(settings.USER_VECTOR_STORAGE, settings.USER_VECTOR_PCA_DIMS),
+                    metadata={"description": "User personal financial data"}
+                )
+                
+                self._knowledge_collection = client.get_or_create_collection(
+                    name="financial_knowledge",
+                    metadata={"description": "Financial knowledge base"}
+                )
+                
+                self._client = client
+                self.component_state["vector_db"] = "ready"
+            except Exception:
+                self.component_state["vector_db"] = "error"
+                raise
+    
+    def _load_encoder(self):
+        """Load the embedding backend selected in settings"""
+        with self._load_lock:
+            if self._encoder is not None:
+                return
+            self.component_state["embedding_model"] = "loading"
+            try:
+                self._encoder = create_embedder()
+                logger.info(f"Embedding backend: {self._encoder.name} ({settings.EMBEDDING_MODEL})")
+                self.component_state["embedding_model"] = "ready"
+            except Exception:
+                self.component_state["embedding_model"] = "error"
+                raise
+    
+    def _load_llm(self):
+        """Create the LLM backend (Gemini, or the local stub for tests/benchmarks)"""
+        with self._load_lock:
+            if self._llm is not None:
+                return
+            self.component_state["llm"] = "loading"
+            try:
+                self._llm = create_llm_client()
+                self.component_state["llm"] = "ready"
+            except Exception:
+                self.component_state["llm"] = "error"
+                raise
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._load_vector_db()
+        return self._client
+    
+    @property
+    def user_data_collection(self):
+        if self._client is None:
+            self._load_vector_db()
+        return self._user_data_collection
+    
+    @property
+    def knowledge_collection(self):
+        if self._client is None:
+            self._load_vector_db()
+        return self._knowledge_collection
+    
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._load_encoder()
+        return self._encoder
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._load_llm()
+        return self._llm
+    
+    def _encode_batch(self, texts: List[str]):
+        """Encode a batch of texts (runs on the embedding worker thread)"""
+        return self.encoder.encode(texts)
+    
+    async def ensure_loaded(self, llm: bool = True):
+        """Load any cold components in a worker thread, off the event loop.
         
-    async def add_user_data(self, user_id: str, data_type: str, data: Dict[str, Any]):
-        """Add user financial data to vector store"""
+        Indexing and search pass ``llm=False``: they only need Chroma and
+        the encoder, and must keep working when the LLM is misconfigured.
+        """
+        if self._client is None or self._encoder is None or (llm and self._llm is None):
+            await asyncio.to_thread(self._load_all, llm)
+    
+    def _load_all(self, llm: bool = True):
+        self._load_vector_db()
+        self._load_encoder()
+        if llm:
+            self._load_llm()
+    
+    async def warm_up(self):
+        """Load every component and run a first encode so requests start warm"""
+        started = time.perf_counter()
+        await self.ensure_loaded(llm=False)
+        await self.embedding_service.encode("warm up")
         try:
-            # Create text representation of the data
-            text_content = self._format_user_data(data_type, data)
-            
-            # Generate embedding
-            embedding = self.encoder.encode([text_content])[0].tolist()
-            
-            # Create unique ID
-            doc_id = f"{user_id}_{data_type}_{uuid.uuid4()}"
-            
-            # Prepare metadata (only str, int, float, bool allowed)
-            metadata = {
-                "user_id": user_id,
-                "data_type": data_type,
+            await self.ensure_loaded()
+        except Exception as e:
+            # Retrieval and indexing still work; chat reports the LLM error
+            logger.error(f"LLM client failed to load: {e}")
+        logger.info(f"RAG components warm in {time.perf_counter() - started:.1f}s")
+    
+    @property
+    def is_ready(self) -> bool:
+        return all(state == "ready" for state in self.component_state.values())
+    
+    def llm_stats(self) -> Dict[str, Any]:
+        """LLM latency stats without forcing the client to load"""
+        if self._llm is None:
+            return {"backend": settings.LLM_BACKEND, "status": self.component_state["llm"]}
+        return self._llm.stats()
+    
+    async def add_user_data_batch(self, items: List[Dict[str, Any]]):
+        """Embed and upsert several user data records with one encode and one write.
+        
+        Each item has ``doc_id``, ``user_id``, ``data_type``, ``data`` and
+        optionally the ``record_id`` of the Mongo document it indexes.
+        Errors are raised so callers can retry.
+        """
+        if not items:
+            return
+        
+        await self.ensure_loaded(llm=False)
+        
+        # Create text representation of the data
+        texts = [self._format_user_data(item["data_type"], item["data"]) for item in items]
+        
+        # Generate embeddings in one batch
+        embeddings = self._to_user_space(await self.embedding_service.encode_many(texts))
+        
+        # Prepare metadata (only str, int, float, bool allowed)
+        metadatas = []
+        for item in items:
+            data = item["data"]
+            metadatas.append({
+                "user_id": item["user_id"],
+                "data_type": item["data_type"],
+                "record_id": item.get("record_id", ""),
                 "timestamp": str(data.get("created_at", "")),
                 "amount": float(data.get("amount", 0)) if data.get("amount") else 0.0,
                 "category": str(data.get("category", "")) if data.get("category") else "",
                 "description": str(data.get("description", "")) if data.get("description") else ""
-            }
-            
-            # Add to collection
-            self.user_data_collection.add(
-                embeddings=[embedding],
-                documents=[text_content],
-                metadatas=[metadata],
-                ids=[doc_id]
+            })
+        
+        # Upsert so a retried batch does not create duplicates
+        await asyncio.to_thread(
+            self.user_data_collection.upsert,
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas,
+            ids=[item["doc_id"] for item in items]
+        )
+        
+        # Keep cached per-user indexes (vector and lexical) in step
+        by_user: Dict[str, List[int]] = {}
+        for i, item in enumerate(items):
+            by_user.setdefault(item["user_id"], []).append(i)
+        for user_id, rows in by_user.items():
+            self.user_index.apply_upserts(
+                user_id,
+                [items[i]["doc_id"] for i in rows],
+                [embeddings[i] for i in rows],
+                [texts[i] for i in rows],
+                [metadatas[i] for i in rows]
             )
-            
-            logger.info(f"Added user data: {data_type} for user {user_id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error adding user data: {e}")
-            return False
+    
+    def _to_user_space(self, embeddings: List[List[float]]) -> List[List[float]]:
+        """Project embeddings into the user vector space (identity unless pca)"""
+        if self.user_projection is None:
+            return embeddings
+        return self.user_projection.transform(embeddings).tolist()
+    
+    async def delete_user_data(self, doc_ids: List[str], user_ids: List[str] = None):
+        """Remove user data vectors by ID (missing IDs are ignored).
+        
+        ``user_ids[i]`` is the owner of ``doc_ids[i]``; it lets cached
+        per-user indexes be updated in place. Without it every cached user
+        index is dropped.
+        """
+        if not doc_ids:
+            return
+        await self.ensure_loaded(llm=False)
+        await asyncio.to_thread(self.user_data_collection.delete, ids=doc_ids)
+        
+        if user_ids is None:
+            self.user_index.invalidate()
+            return
+        by_user: Dict[str, List[str]] = {}
+        for doc_id, user_id in zip(doc_ids, user_ids):
+            by_user.setdefault(user_id, []).append(doc_id)
+        for user_id, user_doc_ids in by_user.items():
+            self.user_index.apply_deletes(user_id, user_doc_ids)
     
     def _format_user_data(self, data_type: str, data: Dict[str, Any]) -> str:
         """Format user data into searchable text"""
@@ -98,124 +320,261 @@ class VectorStore:
         elif data_type == "budget":
             return f"Budget for {data.get('month', 'unknown')} with total budget ₹{data.get('total_budget', 0)} and savings target ₹{data.get('savings_target', 0)}"
         
-        return json.dumps(data)
+        elif data_type == "goal":
+            return f"Goal {data.get('title', 'unknown')} of ₹{data.get('target_amount', 0)} by {data.get('target_date', '')}, saved so far ₹{data.get('current_amount', 0)}. {data.get('description') or ''}"
+        
+        return json.dumps(data, default=str)
     
-    async def search_user_data(self, user_id: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    async def search_user_data(self, user_id: str, query: str, limit: int = 5, query_embedding=None) -> List[Dict[str, Any]]:
         """Search user's financial data"""
         try:
-            # Generate query embedding
-            query_embedding = self.encoder.encode([query])[0].tolist()
-            
-            # Search in user data
-            results = self.user_data_collection.query(
-                query_embeddings=[query_embedding],
-                n_results=limit,
-                where={"user_id": user_id}
-            )
+            await self.ensure_loaded(llm=False)
             
-            # Format results
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        "content": doc,
-                        "metadata": results['metadatas'][0][i] if results['metadatas'] else {},
-                        "distance": results['distances'][0][i] if results['distances'] else 0
-                    })
+            # Generate query embedding unless the caller already has it
+            if query_embedding is None:
+                query_embedding = await self.embedding_service.encode(query)
             
-            return formatted_results
+            query_embedding = self._to_user_space([query_embedding])[0]
+            
+            # Exact vector search fused with BM25 over this user's records
+            # (loaded on demand and cached)
+            return await asyncio.to_thread(
+                self.user_index.search, user_id, query_embedding, limit, query
+            )
             
         except Exception as e:
             logger.error(f"Error searching user data: {e}")
             return []
     
-    async def search_knowledge_base(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+    async def search_knowledge_base(self, query: str, limit: int = 3, query_embedding=None) -> List[Dict[str, Any]]:
         """Search financial knowledge base"""
         try:
-            # Generate query embedding
-            query_embedding = self.encoder.encode([query])[0].tolist()
-            
-            # Search in knowledge base
-            results = self.knowledge_collection.query(
-                query_embeddings=[query_embedding],
-                n_results=limit
+            await self.ensure_loaded(llm=False)
+            
+            # Generate query embedding unless the caller already has it
+            if query_embedding is None:
+                query_embedding = await self.embedding_service.encode(query)
+            
+            # Vector and lexical rankings over a wider pool, fused by rank
+            pool = limit * 4
+            results, lexical_hits = await asyncio.gather(
+                asyncio.to_thread(
+                    self.knowledge_collection.query,
+                    query_embeddings=[query_embedding],
+                    n_results=pool
+                ),
+                asyncio.to_thread(self._search_knowledge_lexical, query, pool)
             )
             
-            # Format results
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        "content": doc,
+            candidates = {}
+            vector_ranking = []
+            if results['ids'] and results['ids'][0]:
+                for i, doc_id in enumerate(results['ids'][0]):
+                    vector_ranking.append(doc_id)
+                    candidates[doc_id] = {
+                        "content": results['documents'][0][i],
                         "metadata": results['metadatas'][0][i] if results['metadatas'] else {},
                         "distance": results['distances'][0][i] if results['distances'] else 0
-                    })
+                    }
             
-            return formatted_results
+            lexical_ranking = []
+            for doc_id, doc in lexical_hits:
+                lexical_ranking.append(doc_id)
+                candidates.setdefault(doc_id, {**doc, "distance": None})
+            
+            # Format results
+            return [
+                candidates[doc_id]
+                for doc_id, _ in reciprocal_rank_fusion([vector_ranking, lexical_ranking], limit=limit)
+            ]
             
         except Exception as e:
             logger.error(f"Error searching knowledge base: {e}")
             return []
     
+    def _search_knowledge_lexical(self, query: str, limit: int):
+        """BM25 search over the knowledge base (blocking; run in a thread)"""
+        with self._knowledge_lock:
+            if self._knowledge_lexical is None:
+                records = self.knowledge_collection.get(include=["documents", "metadatas"])
+                self._knowledge_lexical = BM25Index()
+                self._knowledge_docs = {}
+                for doc_id, doc, metadata in zip(records["ids"], records["documents"], records["metadatas"]):
+                    self._knowledge_lexical.add(doc_id, doc)
+                    self._knowledge_docs[doc_id] = {"content": doc, "metadata": metadata or {}}
+            
+            return [
+                (doc_id, self._knowledge_docs[doc_id])
+                for doc_id, _ in self._knowledge_lexical.search(query, limit)
+            ]
+    
+    def reset_knowledge_lexical(self):
+        """Drop the lexical index so the next search rebuilds it from Chroma"""
+        with self._knowledge_lock:
+            self._knowledge_lexical = None
+            self._knowledge_docs = {}
+    
+    def update_knowledge_lexical(self, upserted: List[Dict[str, Any]], removed_ids: List[str]):
+        """Apply knowledge-base writes to the lexical index, if it is built"""
+        with self._knowledge_lock:
+            if self._knowledge_lexical is None:
+                return
+            for item in upserted:
+                self._knowledge_lexical.add(item["id"], item["content"])
+                self._knowledge_docs[item["id"]] = {"content": item["content"], "metadata": item["metadata"]}
+            for doc_id in removed_ids:
+                self._knowledge_lexical.remove(doc_id)
+                self._knowledge_docs.pop(doc_id, None)
+    
+    async def build_prompt(self, user_id: str, query: str, query_embedding=None):
+        """Retrieve context and build the RAG prompt for a query"""
+        # Import database here to avoid circular imports
+        from database import get_database
+        
+        await self.ensure_loaded(llm=False)
+        
+        db = get_database()
+        
+        # Both searches share one query embedding
+        if query_embedding is None:
+            query_embedding = await self.embedding_service.encode(query)
+        
+        # Run the retrieval stages concurrently; a stage that misses its
+        # budget contributes its fallback instead of failing the request
+        user_context, knowledge_context, current_data = await asyncio.gather(
+            self._run_stage(
+                "user_data",
+                self.search_user_data(user_id, query, limit=5, query_embedding=query_embedding),
+                settings.RAG_USER_SEARCH_TIMEOUT_MS,
+                []
+            ),
+            self._run_stage(
+                "knowledge_base",
+                self.search_knowledge_base(query, limit=3, query_embedding=query_embedding),
+                settings.RAG_KNOWLEDGE_SEARCH_TIMEOUT_MS,
+                []
+            ),
+            self._run_stage(
+                "financial_summary",
+                self._get_current_financial_data(db, user_id),
+                settings.RAG_FINANCIAL_SUMMARY_TIMEOUT_MS,
+                "Current financial summary is temporarily unavailable.\n"
+            )
+        )
+        
+        # Prepare context for AI
+        context_text = "Current Financial Summary:\n"
+        context_text += current_data
+        
+        context_text += "\nUser Financial Data from History:\n"
+        for item in user_context:
+            context_text += f"- {item['content']}\n"
+        
+        context_text += "\nFinancial Knowledge:\n"
+        for item in knowledge_context:
+            context_text += f"- {item['content']}\n"
+        
+        # Create prompt
+        prompt = f"""
+        You are a personal finance assistant AI. Use the following context to answer the user's question.
+        
+        Context:
+        {context_text}
+        
+        User Question: {query}
+        
+        Instructions:
+        1. Provide personalized advice based on the user's financial data
+        2. Use specific numbers and dates from their data when relevant
+        3. Reference financial regulations and best practices from the knowledge base
+        4. Be conversational but professional
+        5. If you don't have enough context, ask for more information
+        6. Always provide actionable insights
+        7. Format amounts in Indian Rupees (₹)
+        8. If the user asks about their financial data and you have access to it, provide specific details
+        
+        Response:
+        """
+        
+        return prompt, user_context, knowledge_context
+    
+    async def _run_stage(self, name: str, coro, timeout_ms: float, fallback):
+        """Run one context stage under its latency budget and record its timing"""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await asyncio.wait_for(coro, timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.warning(f"RAG stage '{name}' exceeded its {timeout_ms:.0f} ms budget, using partial context")
+            return fallback
+        except Exception as e:
+            outcome = "error"
+            logger.error(f"RAG stage '{name}' failed: {e}")
+            return fallback
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats = self.stage_stats.setdefault(
+                name, {"count": 0, "timeouts": 0, "errors": 0, "latencies_ms": deque(maxlen=500)}
+            )
+            stats["count"] += 1
+            stats["timeouts"] += outcome == "timeout"
+            stats["errors"] += outcome == "error"
+            stats["latencies_ms"].append(elapsed_ms)
+            logger.debug(f"RAG stage '{name}' {outcome} in {elapsed_ms:.1f} ms")
+    
+    def get_stage_stats(self) -> Dict[str, Any]:
+        """Per-stage latency and budget-miss stats for context assembly"""
+        return {
+            name: {
+                "count": stats["count"],
+                "timeouts": stats["timeouts"],
+                "errors": stats["errors"],
+                "p50_ms": round(percentile(stats["latencies_ms"], 50), 2),
+                "p95_ms": round(percentile(stats["latencies_ms"], 95), 2),
+            }
+            for name, stats in self.stage_stats.items()
+        }
+    
     async def generate_response(self, user_id: str, query: str) -> Dict[str, Any]:
         """Generate AI response using RAG"""
         try:
-            # Import database here to avoid circular imports
-            from database import get_database
-            
-            # Search user data and knowledge base
-            user_context = await self.search_user_data(user_id, query, limit=5)
-            knowledge_context = await self.search_knowledge_base(query, limit=3)
-            
-            # Get current financial data from database
-            db = get_database()
-            current_data = await self._get_current_financial_data(db, user_id)
-            
-            # Prepare context for AI
-            context_text = "Current Financial Summary:\n"
-            context_text += current_data
-            
-            context_text += "\nUser Financial Data from History:\n"
-            for item in user_context:
-                context_text += f"- {item['content']}\n"
-            
-            context_text += "\nFinancial Knowledge:\n"
-            for item in knowledge_context:
-                context_text += f"- {item['content']}\n"
-            
-            # Create prompt
-            prompt = f"""
-            You are a personal finance assistant AI. Use the following context to answer the user's question.
-            
-            Context:
-            {context_text}
-            
-            User Question: {query}
-            
-            Instructions:
-            1. Provide personalized advice based on the user's financial data
-            2. Use specific numbers and dates from their data when relevant
-            3. Reference financial regulations and best practices from the knowledge base
-            4. Be conversational but professional
-            5. If you don't have enough context, ask for more information
-            6. Always provide actionable insights
-            7. Format amounts in Indian Rupees (₹)
-            8. If the user asks about their financial data and you have access to it, provide specific details
-            
-            Response:
-            """
-            
-            # Generate response
-            response = self.model.generate_content(prompt)
+            # Numeric questions are answered straight from the database
+            routed = await self.answer_structured(user_id, query)
+            if routed is not None:
+                return routed
+            
+            # General questions are answered once for all users
+            if classify_query(query) == "general":
+                return await self._generate_general_response(user_id, query)
+            
+            # Reuse the answer to a near-identical question while the
+            # user's data is unchanged
+            started = time.perf_counter()
+            version = response_cache.data_version(user_id)
+            await self.ensure_loaded()
+            query_embedding = await self.embedding_service.encode(query)
+            cached = response_cache.lookup(user_id, query_embedding)
+            if cached is not None:
+                response_cache.record_latency(True, (time.perf_counter() - started) * 1000)
+                return cached
+            
+            prompt, user_context, knowledge_context = await self.build_prompt(user_id, query, query_embedding)
+            
+            # Generate response without blocking the event loop
+            response_text = await self.llm.generate(prompt)
             
             # Generate suggestions
             suggestions = await self._generate_suggestions(user_context, query)
             
-            return {
-                "response": response.text,
+            result = {
+                "response": response_text,
                 "context_used": len(user_context) > 0 or len(knowledge_context) > 0,
                 "suggestions": suggestions
             }
+            response_cache.store(user_id, query, query_embedding, result, version)
+            response_cache.record_latency(False, (time.perf_counter() - started) * 1000)
+            return result
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
@@ -225,6 +584,106 @@ class VectorStore:
                 "suggestions": []
             }
     
+    async def _generate_general_response(self, user_id: str, query: str) -> Dict[str, Any]:
+        """Answer a general question from the knowledge base alone.
+        
+        The answer contains no user data, so it is cached across users
+        until the knowledge base changes. A short templated tail from the
+        user's snapshot can be appended per request.
+        """
+        started = time.perf_counter()
+        version = shared_answer_cache.data_version(SHARED_ANSWER_SCOPE)
+        await self.ensure_loaded()
+        query_embedding = await self.embedding_service.encode(query)
+        
+        tail_task = None
+        if settings.SHARED_ANSWER_PERSONAL_TAIL:
+            tail_task = asyncio.create_task(self._run_stage(
+                "personal_tail",
+                self._personal_tail(user_id),
+                settings.RAG_FINANCIAL_SUMMARY_TIMEOUT_MS,
+                ""
+            ))
+        
+        try:
+            cached = shared_answer_cache.lookup(SHARED_ANSWER_SCOPE, query_embedding)
+            if cached is None:
+                knowledge_context = await self._run_stage(
+                    "knowledge_base",
+                    self.search_knowledge_base(query, limit=3, query_embedding=query_embedding),
+                    settings.RAG_KNOWLEDGE_SEARCH_TIMEOUT_MS,
+                    []
+                )
+                response_text = await self.llm.generate(self._build_general_prompt(query, knowledge_context))
+                cached = {
+                    "response": response_text,
+                    "context_used": len(knowledge_context) > 0,
+                    "suggestions": await self._generate_suggestions([], query)
+                }
+                shared_answer_cache.store(SHARED_ANSWER_SCOPE, query, query_embedding, cached, version)
+                shared_answer_cache.record_latency(False, (time.perf_counter() - started) * 1000)
+            else:
+                shared_answer_cache.record_latency(True, (time.perf_counter() - started) * 1000)
+            
+            tail = await tail_task if tail_task else ""
+        finally:
+            if tail_task and not tail_task.done():
+                tail_task.cancel()
+        
+        return {**cached, "response": cached["response"] + tail}
+    
+    def _build_general_prompt(self, query: str, knowledge_context: List[Dict[str, Any]]) -> str:
+        """Prompt for a general question, with knowledge context only"""
+        knowledge_text = "".join(f"- {item['content']}\n" for item in knowledge_context)
+        return f"""
+        You are a personal finance assistant AI for users in India. Answer the general finance question below using the knowledge provided.
+        
+        Financial Knowledge:
+        {knowledge_text}
+        
+        User Question: {query}
+        
+        Instructions:
+        1. Give general guidance that applies to anyone; you have no access to the user's own data
+        2. Reference financial regulations and best practices from the knowledge base
+        3. Be conversational but professional
+        4. Always provide actionable insights
+        5. Format amounts in Indian Rupees (₹)
+        
+        Response:
+        """
+    
+    async def _personal_tail(self, user_id: str) -> str:
+        """One templated line of the user's current-month figures"""
+        from datetime import date
+        from database import get_database
+        from summary import get_financial_snapshot
+        
+        today = date.today()
+        snapshot = await get_financial_snapshot(get_database(), user_id, today.replace(day=1), today)
+        income = snapshot["total_income"]
+        expenses = snapshot["total_expenses"]
+        if not income and not expenses:
+            return ""
+        savings_rate = (income - expenses) / income * 100 if income > 0 else 0
+        return (
+            f"\n\nFor reference, this month you have earned ₹{income:,.2f} and spent "
+            f"₹{expenses:,.2f} (savings rate {savings_rate:.1f}%)."
+        )
+    
+    async def answer_structured(self, user_id: str, query: str) -> Optional[Dict[str, Any]]:
+        """Answer a structured question without the LLM, or return None"""
+        from database import get_database
+        
+        routed = await intent_router.route(get_database(), user_id, query)
+        if routed is None:
+            return None
+        return {
+            "response": routed["response"],
+            "context_used": True,
+            "suggestions": await self._generate_suggestions([], query)
+        }
+    
     async def _generate_suggestions(self, user_context: List[Dict], query: str) -> List[str]:
         """Generate follow-up suggestions based on user data"""
         suggestions = []
@@ -260,58 +719,19 @@ class VectorStore:
     async def _get_current_financial_data(self, db, user_id: str) -> str:
         """Get current financial data from database"""
         try:
-            from datetime import datetime, date
-            from utils import prepare_date_range_for_mongo
+            from datetime import date
+            from summary import get_financial_snapshot
             
             current_month = date.today().replace(day=1)
             end_of_month = date.today()
-            date_range = prepare_date_range_for_mongo(current_month, end_of_month)
             
-            # Get current month income
-            income_pipeline = [
-                {"$match": {"user_id": user_id, "date": date_range}},
-                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-            ]
-            income_result = await db.income.aggregate(income_pipeline).to_list(1)
-            total_income = income_result[0]["total"] if income_result else 0
-            
-            # Get current month expenses
-            expense_pipeline = [
-                {"$match": {"user_id": user_id, "date": date_range}},
-                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-            ]
-            expense_result = await db.expenses.aggregate(expense_pipeline).to_list(1)
-            total_expenses = expense_result[0]["total"] if expense_result else 0
-            
-            # Get total investments
-            investment_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-            ]
-            investment_result = await db.investments.aggregate(investment_pipeline).to_list(1)
-            total_investments = investment_result[0]["total"] if investment_result else 0
-            
-            # Get total loans
-            loan_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {"_id": None, "total": {"$sum": "$outstanding"}}}
-            ]
-            loan_result = await db.loans.aggregate(loan_pipeline).to_list(1)
-            total_loans = loan_result[0]["total"] if loan_result else 0
-            
-            # Get recent income sources
-            recent_income = await db.income.find(
-                {"user_id": user_id},
-                {"source": 1, "amount": 1, "date": 1}
-            ).sort("date", -1).limit(5).to_list(5)
-            
-            # Get recent expenses by category
-            expense_categories = await db.expenses.aggregate([
-                {"$match": {"user_id": user_id, "date": date_range}},
-                {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}},
-                {"$sort": {"total": -1}},
-                {"$limit": 5}
-            ]).to_list(5)
+            snapshot = await get_financial_snapshot(db, user_id, current_month, end_of_month)
+            total_income = snapshot["total_income"]
+            total_expenses = snapshot["total_expenses"]
+            total_investments = snapshot["total_investments"]
+            total_loans = snapshot["total_loans"]
+            recent_income = snapshot["recent_income"]
+            expense_categories = snapshot["top_expense_categories"]
             
             # Format the summary
             summary = f"""
@@ -348,8 +768,11 @@ class FinanceDataScraper:
     
     async def scrape_and_store_knowledge(self):
         """Scrape financial knowledge and store in vector database"""
+        state = self.vector_store.component_state
         try:
             logger.info("Starting financial knowledge scraping...")
+            state["knowledge_base"] = "loading"
+            await self.vector_store.ensure_loaded(llm=False)
             
             # Scrape RBI data
             await self._scrape_rbi_data()
@@ -361,8 +784,10 @@ class FinanceDataScraper:
             await self._add_static_knowledge()
             
             logger.info("Completed financial knowledge scraping")
+            state["knowledge_base"] = "ready"
             
         except Exception as e:
+            state["knowledge_base"] = "error"
             logger.error(f"Error scraping financial data: {e}")
     
     async def _scrape_rbi_data(self):
@@ -465,32 +890,102 @@ class FinanceDataScraper:
             logger.error(f"Error adding static knowledge: {e}")
     
     async def _store_knowledge_items(self, items: List[Dict[str, str]]):
-        """Store knowledge items in vector database"""
-        for item in items:
-            try:
-                # Generate embedding
-                embedding = self.vector_store.encoder.encode([item['content']])[0].tolist()
-                
-                # Create unique ID
-                doc_id = str(uuid.uuid4())
-                
-                # Add to collection
-                self.vector_store.knowledge_collection.add(
-                    embeddings=[embedding],
-                    documents=[item['content']],
-                    metadatas=[{
-                        "title": item['title'],
-                        "source": item['source'],
-                        "category": item['category']
-                    }],
-                    ids=[doc_id]
+        """Upsert knowledge items under content-hash IDs, encoding only new ones"""
+        if not items:
+            return
+        
+        collection = self.vector_store.knowledge_collection
+        items_by_id = {self._knowledge_item_id(item): item for item in items}
+        
+        try:
+            # Items whose content is already stored keep their embedding
+            existing_ids = set((await asyncio.to_thread(
+                collection.get, ids=list(items_by_id), include=[]
+            ))["ids"])
+            new_ids = [doc_id for doc_id in items_by_id if doc_id not in existing_ids]
+            
+            if new_ids:
+                # One batched encode and one upsert per source
+                new_items = [items_by_id[doc_id] for doc_id in new_ids]
+                embeddings = await self.vector_store.embedding_service.encode_many(
+                    [item['content'] for item in new_items]
                 )
-                
-            except Exception as e:
-                logger.error(f"Error storing knowledge item: {e}")
+                metadatas = [{
+                    "title": item['title'],
+                    "source": item['source'],
+                    "category": item['category']
+                } for item in new_items]
+                await asyncio.to_thread(
+                    collection.upsert,
+                    embeddings=embeddings,
+                    documents=[item['content'] for item in new_items],
+                    metadatas=metadatas,
+                    ids=new_ids
+                )
+            else:
+                new_items, metadatas = [], []
+            
+            # Drop stale versions and legacy random-ID duplicates from the same sources
+            removed_ids = await asyncio.to_thread(
+                self._prune_knowledge_items, {item['source'] for item in items}, set(items_by_id)
+            )
+            
+            # Shared answers were generated from the previous knowledge base
+            if new_ids or removed_ids:
+                shared_answer_cache.bump_version(SHARED_ANSWER_SCOPE)
+            
+            await asyncio.to_thread(
+                self.vector_store.update_knowledge_lexical,
+                [
+                    {"id": doc_id, "content": item['content'], "metadata": metadata}
+                    for doc_id, item, metadata in zip(new_ids, new_items, metadatas)
+                ],
+                removed_ids
+            )
+            
+            logger.info(
+                f"Knowledge items: {len(new_ids)} added, "
+                f"{len(items_by_id) - len(new_ids)} unchanged, {len(removed_ids)} stale removed"
+            )
+            
+        except Exception as e:
+            logger.error(f"Error storing knowledge items: {e}")
+    
+    def _prune_knowledge_items(self, sources, keep_ids) -> List[str]:
+        """Delete items from the given sources that are not in keep_ids (blocking; run in a thread)"""
+        collection = self.vector_store.knowledge_collection
+        removed_ids = []
+        for source in sources:
+            stored = collection.get(where={"source": source}, include=[])
+            stale_ids = [doc_id for doc_id in stored["ids"] if doc_id not in keep_ids]
+            if stale_ids:
+                collection.delete(ids=stale_ids)
+                removed_ids.extend(stale_ids)
+        return removed_ids
+    
+    @staticmethod
+    def _knowledge_item_id(item: Dict[str, str]) -> str:
+        """Deterministic content-hash ID for a knowledge item"""
+        payload = json.dumps(
+            [item['source'], item['title'], item['category'], item['content']],
+            ensure_ascii=False
+        )
+        return f"kb_{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
 
 # Initialize global instances
 vector_store = VectorStore()
 finance_scraper = FinanceDataScraper()
 finance_scraper.set_vector_store(vector_store)
 
+async def warm_up_rag_system(ingest_knowledge: bool = True):
+    """Warm the RAG stack in the background after the API starts serving"""
+    try:
+        await vector_store.warm_up()
+    except Exception as e:
+        logger.error(f"RAG warm-up failed: {e}")
+        return
+    if ingest_knowledge:
+        await finance_scraper.scrape_and_store_knowledge()
+    else:
+        vector_store.component_state["knowledge_base"] = "ready"
+
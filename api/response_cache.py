@@ -0,0 +1,186 @@
+"""
+Per-user semantic cache of chat responses, invalidated by data writes
+"""
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedResponse:
+    def __init__(self, query: str, embedding: np.ndarray, response: Dict[str, Any]):
+        self.query = query
+        self.embedding = embedding
+        self.response = response
+        self.created_at = time.monotonic()
+        self.nbytes = embedding.nbytes + len(query) + len(json.dumps(response, default=str)) + 256
+
+
+class _UserResponses:
+    def __init__(self, version: int):
+        self.version = version
+        self.entries: List[_CachedResponse] = []
+        self.nbytes = 0
+
+
+class ResponseCache:
+    """Reuses a chat answer when the same user asks a near-identical question.
+
+    Entries are keyed by user (or by any shared scope) and matched on cosine similarity of the query
+    embedding. Each user has a data version that finance writes bump, and
+    answers cached under an older version are never served. Users are
+    evicted least recently used first to keep the cache under ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_entries_per_user: int = 50,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 86400,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries_per_user = max_entries_per_user
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+
+        self._users: "OrderedDict[str, _UserResponses]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._total_bytes = 0
+
+        # Stats
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+        self._hit_ms = deque(maxlen=500)
+        self._miss_ms = deque(maxlen=500)
+
+    def data_version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump_version(self, user_id: str):
+        """Mark a user's data as changed so cached answers are not reused"""
+        self._versions[user_id] = self.data_version(user_id) + 1
+        self._drop_user(user_id)
+        self._invalidations += 1
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, user_id: str, query_embedding) -> Optional[Dict[str, Any]]:
+        """The cached response for a similar query under the current data version"""
+        user = self._users.get(user_id)
+        if user is None or user.version != self.data_version(user_id):
+            if user is not None:
+                self._drop_user(user_id)
+            self._misses += 1
+            return None
+
+        now = time.monotonic()
+        expired = [entry for entry in user.entries if now - entry.created_at > self.ttl_seconds]
+        for entry in expired:
+            self._remove_entry(user, entry)
+
+        query = self._normalize(query_embedding)
+        best, best_score = None, self.similarity_threshold
+        for entry in user.entries:
+            score = float(entry.embedding @ query)
+            if score >= best_score:
+                best, best_score = entry, score
+
+        if best is None:
+            self._misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self._hits += 1
+        return best.response
+
+    def store(self, user_id: str, query: str, query_embedding, response: Dict[str, Any], version: int):
+        """Cache a response computed from the user's data at ``version``"""
+        if version != self.data_version(user_id):
+            # The user's data changed while the response was being generated
+            return
+
+        user = self._users.get(user_id)
+        if user is None or user.version != version:
+            self._drop_user(user_id)
+            user = self._users[user_id] = _UserResponses(version)
+        self._users.move_to_end(user_id)
+
+        entry = _CachedResponse(query, self._normalize(query_embedding), response)
+        if entry.nbytes > self.max_bytes:
+            return
+        user.entries.append(entry)
+        user.nbytes += entry.nbytes
+        self._total_bytes += entry.nbytes
+
+        while len(user.entries) > self.max_entries_per_user:
+            self._remove_entry(user, user.entries[0])
+            self._evictions += 1
+        while self._total_bytes > self.max_bytes:
+            evicted_id, evicted = next(iter(self._users.items()))
+            if evicted.entries:
+                self._remove_entry(evicted, evicted.entries[0])
+                self._evictions += 1
+            if not evicted.entries:
+                del self._users[evicted_id]
+
+    def record_latency(self, hit: bool, elapsed_ms: float):
+        (self._hit_ms if hit else self._miss_ms).append(elapsed_ms)
+
+    def _remove_entry(self, user: _UserResponses, entry: _CachedResponse):
+        user.entries.remove(entry)
+        user.nbytes -= entry.nbytes
+        self._total_bytes -= entry.nbytes
+
+    def _drop_user(self, user_id: str):
+        user = self._users.pop(user_id, None)
+        if user is not None:
+            self._total_bytes -= user.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "users_cached": len(self._users),
+            "entries": sum(len(user.entries) for user in self._users.values()),
+            "bytes_cached": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+            "invalidations": self._invalidations,
+            "evictions": self._evictions,
+            "hit_ms_p50": round(percentile(self._hit_ms, 50), 2),
+            "miss_ms_p50": round(percentile(self._miss_ms, 50), 2),
+            "miss_ms_p95": round(percentile(self._miss_ms, 95), 2),
+        }
+
+
+# Initialize global instance
+response_cache = ResponseCache(
+    max_bytes=int(settings.RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+    max_entries_per_user=settings.RESPONSE_CACHE_MAX_ENTRIES_PER_USER,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
+# Answers to general questions, shared by all users and versioned by the
+# knowledge base
+shared_answer_cache = ResponseCache(
+    max_bytes=int(settings.SHARED_ANSWER_CACHE_MAX_MB * 1024 * 1024),
+    max_entries_per_user=settings.SHARED_ANSWER_CACHE_MAX_ENTRIES,
+    similarity_threshold=settings.SHARED_ANSWER_CACHE_SIMILARITY,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,172 @@
+"""
+Incrementally maintained per-user monthly rollups of income and expenses
+"""
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Rollup kind -> (source collection, field used as the rollup category)
+ROLLUP_SOURCES = {
+    "income": ("income", "source"),
+    "expense": ("expenses", "category"),
+}
+
+
+def month_key(value) -> Optional[str]:
+    """Format a date/datetime as the YYYY-MM rollup month"""
+    if isinstance(value, (date, datetime)):
+        return f"{value.year}-{value.month:02d}"
+    return None
+
+
+def _rollup_key(user_id: str, kind: str, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Identify the rollup bucket a record belongs to"""
+    month = month_key(doc.get("date"))
+    if month is None:
+        return None
+    _, category_field = ROLLUP_SOURCES[kind]
+    return {
+        "user_id": user_id,
+        "kind": kind,
+        "month": month,
+        "category": doc.get(category_field) or "other"
+    }
+
+
+def _rollup_update(key: Dict[str, Any], amount: float, count: int) -> UpdateOne:
+    year, month_num = key["month"].split("-")
+    return UpdateOne(
+        key,
+        {
+            "$inc": {"total": amount, "count": count},
+            "$setOnInsert": {"year": int(year), "month_num": int(month_num)},
+            "$set": {"updated_at": datetime.utcnow()}
+        },
+        upsert=True
+    )
+
+
+async def apply_rollup_changes(
+    db,
+    user_id: str,
+    kind: str,
+    added: List[Dict[str, Any]] = (),
+    removed: List[Dict[str, Any]] = ()
+):
+    """Apply record inserts/deletes to the monthly rollups with atomic $inc.
+
+    An update is a removal of the old version plus an addition of the new
+    one. Failures are logged rather than raised; ``rebuild_rollups`` repairs
+    any drift.
+    """
+    try:
+        deltas: Dict[tuple, List[float]] = {}
+        for sign, docs in ((1, added), (-1, removed)):
+            for doc in docs:
+                key = _rollup_key(user_id, kind, doc)
+                if key is None:
+                    continue
+                bucket = deltas.setdefault(tuple(key.items()), [0.0, 0])
+                bucket[0] += sign * float(doc.get("amount", 0) or 0)
+                bucket[1] += sign
+
+        operations = [
+            _rollup_update(dict(key), amount, count)
+            for key, (amount, count) in deltas.items()
+            if amount or count
+        ]
+        if not operations:
+            return
+
+        await db.monthly_rollups.bulk_write(operations, ordered=False)
+
+        # Drop buckets that no longer contain any records
+        if removed:
+            await db.monthly_rollups.delete_many({
+                "user_id": user_id,
+                "kind": kind,
+                "count": {"$lte": 0}
+            })
+
+    except Exception as e:
+        logger.error(f"Error updating {kind} rollups for user {user_id}: {e}")
+
+
+async def get_monthly_rollups(db, user_id: str, kind: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Get a user's rollup buckets for the months covering a date range"""
+    cursor = db.monthly_rollups.find(
+        {
+            "user_id": user_id,
+            "kind": kind,
+            "month": {"$gte": month_key(start_date), "$lte": month_key(end_date)}
+        },
+        {"_id": 0, "month": 1, "year": 1, "month_num": 1, "category": 1, "total": 1, "count": 1}
+    ).sort("month", 1)
+    return await cursor.to_list(None)
+
+
+async def rebuild_rollups(db, user_id: Optional[str] = None):
+    """Recompute rollups from the raw collections (all users or one user).
+
+    Buckets are replaced in place with ``$merge`` and buckets the rebuild
+    did not produce are deleted afterwards, so analytics keep reading
+    complete rollups while it runs.
+    """
+    # Stamp rebuilt buckets; Mongo stores milliseconds, so truncate to match
+    started = datetime.utcnow()
+    started = started.replace(microsecond=started.microsecond // 1000 * 1000)
+
+    for kind, (collection_name, category_field) in ROLLUP_SOURCES.items():
+        match: Dict[str, Any] = {"date": {"$type": "date"}}
+        scope: Dict[str, Any] = {"kind": kind}
+        if user_id:
+            match["user_id"] = user_id
+            scope["user_id"] = user_id
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "month": {"$dateToString": {"format": "%Y-%m", "date": "$date"}},
+                    # Missing, null and empty categories go to "other", as in _rollup_key
+                    "category": {"$cond": [
+                        {"$in": [{"$ifNull": [f"${category_field}", ""]}, [""]]},
+                        "other",
+                        f"${category_field}"
+                    ]}
+                },
+                "year": {"$first": {"$year": "$date"}},
+                "month_num": {"$first": {"$month": "$date"}},
+                "total": {"$sum": "$amount"},
+                "count": {"$sum": 1}
+            }},
+            {"$project": {
+                "_id": 0,
+                "user_id": "$_id.user_id",
+                "kind": {"$literal": kind},
+                "month": "$_id.month",
+                "category": "$_id.category",
+                "year": 1,
+                "month_num": 1,
+                "total": 1,
+                "count": 1,
+                "updated_at": {"$literal": started}
+            }},
+            {"$merge": {
+                "into": "monthly_rollups",
+                "on": ["user_id", "kind", "month", "category"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        await getattr(db, collection_name).aggregate(pipeline).to_list(None)
+
+        # Buckets neither rebuilt nor touched by a live update since the start are stale
+        await db.monthly_rollups.delete_many({**scope, "updated_at": {"$lt": started}})
+
+    logger.info(f"Rebuilt monthly rollups for {'user ' + user_id if user_id else 'all users'}")
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Optional
+from typing import List, Optional
 from models import FinancialSummary, ExpenseAnalytics, InvestmentAnalytics
 from auth import get_current_user
 from database import get_database
 from utils import prepare_date_range_for_mongo
+from summary import get_financial_snapshot
+from rollups import get_monthly_rollups
+from serialization import FastJSONResponse
 from datetime import datetime, date, timedelta
 import logging
 from collections import defaultdict
@@ -35,50 +38,13 @@ async def get_financial_summary(
             start_date = date(today.year, today.month, 1)
             end_date = today
         
-        # Calculate total income
-        date_range = prepare_date_range_for_mongo(start_date, end_date)
-        income_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": date_range
-            }},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        income_result = await db.income.aggregate(income_pipeline).to_list(1)
-        total_income = income_result[0]["total"] if income_result else 0
-        
-        # Calculate total expenses
-        expense_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": date_range
-            }},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        expense_result = await db.expenses.aggregate(expense_pipeline).to_list(1)
-        total_expenses = expense_result[0]["total"] if expense_result else 0
-        
-        # Calculate total investments
-        investment_pipeline = [
-            {"$match": {"user_id": user_id}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        investment_result = await db.investments.aggregate(investment_pipeline).to_list(1)
-        total_investments = investment_result[0]["total"] if investment_result else 0
-        
-        # Calculate total loan outstanding
-        loan_pipeline = [
-            {"$match": {"user_id": user_id}},
-            {"$group": {"_id": None, "total": {"$sum": "$outstanding"}}}
-        ]
-        loan_result = await db.loans.aggregate(loan_pipeline).to_list(1)
-        total_loans = loan_result[0]["total"] if loan_result else 0
-        
-        # Calculate current investment values
-        investment_cursor = db.investments.find({"user_id": user_id})
-        current_investment_value = 0
-        async for inv in investment_cursor:
-            current_investment_value += inv.get("current_value", inv.get("amount", 0))
+        # All summary figures in about one database round trip
+        snapshot = await get_financial_snapshot(db, user_id, start_date, end_date)
+        total_income = snapshot["total_income"]
+        total_expenses = snapshot["total_expenses"]
+        total_investments = snapshot["total_investments"]
+        total_loans = snapshot["total_loans"]
+        current_investment_value = snapshot["current_investment_value"]
         
         # Calculate metrics
         net_worth = current_investment_value - total_loans
@@ -117,43 +83,19 @@ async def get_expense_analytics(
         start_date = date(end_date.year, end_date.month - months + 1, 1) if end_date.month > months else date(end_date.year - 1, end_date.month - months + 13, 1)
         date_range = prepare_date_range_for_mongo(start_date, end_date)
         
-        # Get category breakdown
-        category_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": date_range
-            }},
-            {"$group": {
-                "_id": "$category",
-                "total": {"$sum": "$amount"}
-            }},
-            {"$sort": {"total": -1}}
-        ]
-        category_result = await db.expenses.aggregate(category_pipeline).to_list(20)
-        category_breakdown = {item["_id"]: item["total"] for item in category_result}
+        # Category breakdown and monthly trend from the monthly rollups
+        rollups = await get_monthly_rollups(db, user_id, "expense", start_date, end_date)
         
-        # Get monthly trend
-        monthly_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": date_range
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$date"},
-                    "month": {"$month": "$date"}
-                },
-                "total": {"$sum": "$amount"}
-            }},
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
-        monthly_result = await db.expenses.aggregate(monthly_pipeline).to_list(12)
+        category_totals = defaultdict(float)
+        monthly_totals = defaultdict(float)
+        for bucket in rollups:
+            category_totals[bucket["category"]] += bucket["total"]
+            monthly_totals[bucket["month"]] += bucket["total"]
+        
+        category_breakdown = dict(sorted(category_totals.items(), key=lambda item: item[1], reverse=True))
         monthly_trend = [
-            {
-                "month": f"{item['_id']['year']}-{item['_id']['month']:02d}",
-                "amount": item["total"]
-            }
-            for item in monthly_result
+            {"month": month, "amount": amount}
+            for month, amount in sorted(monthly_totals.items())
         ]
         
         # Get top expenses
@@ -251,40 +193,18 @@ async def get_spending_trends(
         end_date = date.today()
         start_date = date(end_date.year - 1, end_date.month, 1) if months >= 12 else date(end_date.year, end_date.month - months + 1, 1)
         
-        # Convert to datetime for MongoDB queries
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        
-        # Get spending by category and month
-        pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": {"$gte": start_datetime, "$lte": end_datetime}
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$date"},
-                    "month": {"$month": "$date"},
-                    "category": "$category"
-                },
-                "amount": {"$sum": "$amount"}
-            }},
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
-        
-        result = await db.expenses.aggregate(pipeline).to_list(1000)
+        # Spending by category and month from the monthly rollups
+        rollups = await get_monthly_rollups(db, user_id, "expense", start_date, end_date)
         
         # Organize data
         trends = defaultdict(list)
-        for item in result:
-            month_key = f"{item['_id']['year']}-{item['_id']['month']:02d}"
-            category = item['_id']['category']
-            trends[category].append({
-                "month": month_key,
-                "amount": item["amount"]
+        for bucket in rollups:
+            trends[bucket["category"]].append({
+                "month": bucket["month"],
+                "amount": bucket["total"]
             })
         
-        return {"trends": dict(trends)}
+        return FastJSONResponse({"trends": trends})
         
     except Exception as e:
         logger.error(f"Error calculating spending trends: {e}")
@@ -301,7 +221,10 @@ async def get_goal_progress(current_user: dict = Depends(get_current_user)):
         user_id = current_user["sub"]
         
         # Get all goals
-        cursor = db.goals.find({"user_id": user_id}).sort("target_date", 1)
+        cursor = db.goals.find(
+            {"user_id": user_id},
+            {"title": 1, "target_amount": 1, "current_amount": 1, "target_date": 1, "created_at": 1}
+        ).sort("target_date", 1)
         
         goals_progress = []
         async for goal in cursor:
@@ -320,7 +243,7 @@ async def get_goal_progress(current_user: dict = Depends(get_current_user)):
             required_monthly_savings = remaining_amount / months_remaining if months_remaining > 0 else 0
             
             goals_progress.append({
-                "id": str(goal["_id"]),
+                "id": goal["_id"],
                 "title": goal["title"],
                 "target_amount": goal["target_amount"],
                 "current_amount": goal["current_amount"],
@@ -331,7 +254,7 @@ async def get_goal_progress(current_user: dict = Depends(get_current_user)):
                 "on_track": progress_percentage >= (100 - (days_remaining / max(1, (target_date - goal.get("created_at", datetime.utcnow()).date()).days) * 100)) if days_remaining > 0 else True
             })
         
-        return {"goals": goals_progress}
+        return FastJSONResponse({"goals": goals_progress})
         
     except Exception as e:
         logger.error(f"Error calculating goal progress: {e}")
@@ -354,55 +277,28 @@ async def get_income_analytics(
         end_date = date.today()
         start_date = date(end_date.year, end_date.month - months + 1, 1) if end_date.month > months else date(end_date.year - 1, end_date.month - months + 13, 1)
         
-        # Convert to datetime for MongoDB queries
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        end_datetime = datetime.combine(end_date, datetime.max.time())
+        # Source breakdown and monthly trend from the monthly rollups
+        rollups = await get_monthly_rollups(db, user_id, "income", start_date, end_date)
+        
+        source_totals = defaultdict(float)
+        monthly_totals = {}
+        for bucket in rollups:
+            source_totals[bucket["category"]] += bucket["total"]
+            month = monthly_totals.setdefault(bucket["month"], {
+                "month": f"{bucket['month_num']:02d}/{bucket['year']}",
+                "year": bucket["year"],
+                "month_num": bucket["month_num"],
+                "amount": 0
+            })
+            month["amount"] += bucket["total"]
         
-        # Get source breakdown
-        source_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": {"$gte": start_datetime, "$lte": end_datetime}
-            }},
-            {"$group": {
-                "_id": "$source",
-                "total": {"$sum": "$amount"}
-            }},
-            {"$sort": {"total": -1}}
-        ]
-        source_result = await db.income.aggregate(source_pipeline).to_list(20)
-        source_breakdown = {item["_id"]: item["total"] for item in source_result}
+        source_breakdown = dict(sorted(source_totals.items(), key=lambda item: item[1], reverse=True))
+        monthly_trend = [monthly_totals[month] for month in sorted(monthly_totals)]
         
-        # Get monthly trend
-        monthly_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": {"$gte": start_datetime, "$lte": end_datetime}
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$date"},
-                    "month": {"$month": "$date"}
-                },
-                "total": {"$sum": "$amount"}
-            }},
-            {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]
-        monthly_result = await db.income.aggregate(monthly_pipeline).to_list(12)
-        monthly_trend = [
-            {
-                "month": f"{item['_id']['month']:02d}/{item['_id']['year']}",
-                "year": item['_id']['year'],
-                "month_num": item['_id']['month'],
-                "amount": item["total"]
-            }
-            for item in monthly_result
-        ]
-        
-        return {
+        return FastJSONResponse({
             "source_breakdown": source_breakdown,
             "monthly_trend": monthly_trend
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error calculating income analytics: {e}")
@@ -411,7 +307,7 @@ async def get_income_analytics(
             detail="Internal server error"
         )
 
-@router.get("/monthly-comparison", response_model=dict)
+@router.get("/monthly-comparison", response_model=List[dict])
 async def get_monthly_comparison(
     current_user: dict = Depends(get_current_user),
     months: int = Query(default=6, le=12)
@@ -425,43 +321,14 @@ async def get_monthly_comparison(
         end_date = date.today()
         start_date = date(end_date.year, end_date.month - months + 1, 1) if end_date.month > months else date(end_date.year - 1, end_date.month - months + 13, 1)
         
-        # Convert to datetime for MongoDB queries
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        end_datetime = datetime.combine(end_date, datetime.max.time())
+        # Monthly income and expenses from the monthly rollups
+        income_by_month = defaultdict(float)
+        for bucket in await get_monthly_rollups(db, user_id, "income", start_date, end_date):
+            income_by_month[bucket["month"]] += bucket["total"]
         
-        # Get monthly income
-        income_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": {"$gte": start_datetime, "$lte": end_datetime}
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$date"},
-                    "month": {"$month": "$date"}
-                },
-                "total": {"$sum": "$amount"}
-            }}
-        ]
-        income_result = await db.income.aggregate(income_pipeline).to_list(12)
-        income_by_month = {f"{item['_id']['year']}-{item['_id']['month']:02d}": item["total"] for item in income_result}
-        
-        # Get monthly expenses
-        expense_pipeline = [
-            {"$match": {
-                "user_id": user_id,
-                "date": {"$gte": start_datetime, "$lte": end_datetime}
-            }},
-            {"$group": {
-                "_id": {
-                    "year": {"$year": "$date"},
-                    "month": {"$month": "$date"}
-                },
-                "total": {"$sum": "$amount"}
-            }}
-        ]
-        expense_result = await db.expenses.aggregate(expense_pipeline).to_list(12)
-        expense_by_month = {f"{item['_id']['year']}-{item['_id']['month']:02d}": item["total"] for item in expense_result}
+        expense_by_month = defaultdict(float)
+        for bucket in await get_monthly_rollups(db, user_id, "expense", start_date, end_date):
+            expense_by_month[bucket["month"]] += bucket["total"]
         
         # Create comparison data
         comparison_data = []
@@ -487,7 +354,7 @@ async def get_monthly_comparison(
             else:
                 current_date = current_date.replace(month=current_date.month + 1)
         
-        return comparison_data
+        return FastJSONResponse(comparison_data)
         
     except Exception as e:
         logger.error(f"Error calculating monthly comparison: {e}")
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials
-from models import UserCreate, UserLogin, User, Token
+from models import UserCreate, UserLogin, User, Token, RefreshTokenRequest
 from auth import auth_manager, get_current_user, generate_user_id
 from database import get_database
+from password_hashing import PasswordHasherBusy
+from sessions import session_store
 from datetime import datetime
 import logging
 
@@ -46,7 +48,7 @@ async def demo_login():
         )
 
 @router.post("/register", response_model=dict)
-async def register_user(user_data: UserCreate):
+async def register_user(user_data: UserCreate, request: Request):
     """Register a new user"""
     try:
         db = get_database()
@@ -67,7 +69,7 @@ async def register_user(user_data: UserCreate):
             )
         
         # Hash password
-        hashed_password = auth_manager.hash_password(user_data.password)
+        hashed_password = await auth_manager.hash_password(user_data.password)
         
         # Create user
         user_id = generate_user_id()
@@ -83,14 +85,16 @@ async def register_user(user_data: UserCreate):
         # Insert user
         result = await db.users.insert_one(user_doc)
         
-        # Create token
-        access_token = auth_manager.create_token(user_id, user_data.email)
+        # Create tokens
+        session_id, refresh_token = await session_store.create(db, user_id, user_data.email, request.headers.get("user-agent"))
+        access_token = auth_manager.create_token(user_id, user_data.email, session_id)
         
         logger.info(f"User registered successfully: {user_data.email}")
         
         return {
             "message": "User registered successfully",
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
             "user": {
                 "user_id": user_id,
@@ -101,6 +105,12 @@ async def register_user(user_data: UserCreate):
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Registration error: {e}")
         raise HTTPException(
@@ -109,7 +119,7 @@ async def register_user(user_data: UserCreate):
         )
 
 @router.post("/login", response_model=dict)
-async def login_user(user_data: UserLogin):
+async def login_user(user_data: UserLogin, request: Request):
     """Login user"""
     try:
         db = get_database()
@@ -130,20 +140,27 @@ async def login_user(user_data: UserLogin):
             )
         
         # Verify password
-        if not auth_manager.verify_password(user_data.password, user["password"]):
+        valid, new_hash = await auth_manager.verify_and_update_password(user_data.password, user["password"])
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
-        # Create token
-        access_token = auth_manager.create_token(user["user_id"], user["email"])
+        # Re-hash passwords stored with an outdated cost
+        if new_hash:
+            await db.users.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+        
+        # Create tokens
+        session_id, refresh_token = await session_store.create(db, user["user_id"], user["email"], request.headers.get("user-agent"))
+        access_token = auth_manager.create_token(user["user_id"], user["email"], session_id)
         
         logger.info(f"User logged in successfully: {user_data.email}")
         
         return {
             "message": "Login successful",
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
             "user": {
                 "user_id": user["user_id"],
@@ -154,6 +171,12 @@ async def login_user(user_data: UserLogin):
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Login error: {e}")
         raise HTTPException(
@@ -161,6 +184,86 @@ async def login_user(user_data: UserLogin):
             detail="Internal server error"
         )
 
+@router.post("/refresh", response_model=dict)
+async def refresh_access_token(refresh_data: RefreshTokenRequest):
+    """Exchange a refresh token for a new access token and refresh token"""
+    try:
+        db = get_database()
+        
+        # Check if database is available
+        if db is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database service unavailable - running in offline mode"
+            )
+        
+        rotated = await session_store.rotate(db, refresh_data.refresh_token)
+        if rotated is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired refresh token"
+            )
+        session, refresh_token = rotated
+        
+        return {
+            "access_token": auth_manager.create_token(session["user_id"], session["email"], str(session["_id"])),
+            "refresh_token": refresh_token,
+            "token_type": "bearer"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Token refresh error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.post("/logout", response_model=dict)
+async def logout_user(refresh_data: RefreshTokenRequest):
+    """Revoke the session behind a refresh token"""
+    try:
+        db = get_database()
+        
+        if db is not None:
+            await session_store.revoke(db, refresh_data.refresh_token)
+        
+        return {"message": "Logged out successfully"}
+        
+    except Exception as e:
+        logger.error(f"Logout error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.post("/logout-all", response_model=dict)
+async def logout_all_sessions(current_user: dict = Depends(get_current_user)):
+    """Revoke every refresh-token session of the current user"""
+    try:
+        db = get_database()
+        
+        if db is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database service unavailable - running in offline mode"
+            )
+        
+        revoked = await session_store.revoke_all(db, current_user["sub"])
+        logger.info(f"Revoked {revoked} sessions for user: {current_user['sub']}")
+        
+        return {"message": "Logged out of all sessions", "sessions_revoked": revoked}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Logout-all error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
 @router.get("/profile", response_model=dict)
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
     """Get user profile"""
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
 from models import ChatMessage, ChatResponse
 from auth import get_current_user
 from rag_system import vector_store
+import asyncio
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chat", tags=["AI Chat"])
@@ -30,6 +35,89 @@ async def chat_with_ai(
             detail="Internal server error"
         )
 
+def _sse_event(event: str, data: dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/stream")
+async def stream_chat_with_ai(
+    chat_data: ChatMessage,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat with AI assistant, streaming tokens as server-sent events"""
+    user_id = current_user["sub"]
+    
+    # Load the LLM client (and retrieval) off the event loop before streaming,
+    # so a cold worker does not build it inline and failures get a status code
+    try:
+        await vector_store.ensure_loaded()
+    except Exception as e:
+        logger.error(f"AI assistant unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI assistant is temporarily unavailable"
+        )
+    
+    async def event_stream():
+        started = time.perf_counter()
+        ttft_ms = None
+        try:
+            routed = await vector_store.answer_structured(user_id, chat_data.message)
+            if routed is not None:
+                total_ms = (time.perf_counter() - started) * 1000
+                yield _sse_event("token", {"text": routed["response"]})
+                yield _sse_event("done", {
+                    "context_used": routed["context_used"],
+                    "suggestions": routed["suggestions"],
+                    "ttft_ms": round(total_ms, 2),
+                    "total_ms": round(total_ms, 2)
+                })
+                return
+            
+            prompt, user_context, knowledge_context = await vector_store.build_prompt(
+                user_id, chat_data.message
+            )
+            
+            async with aclosing(vector_store.llm.stream(prompt)) as tokens:
+                async for token in tokens:
+                    if await request.is_disconnected():
+                        logger.info(f"Client disconnected, cancelled AI chat stream for user: {user_id}")
+                        return
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    yield _sse_event("token", {"text": token})
+            
+            suggestions = await vector_store._generate_suggestions(user_context, chat_data.message)
+            total_ms = (time.perf_counter() - started) * 1000
+            
+            logger.info(
+                f"AI chat stream completed for user: {user_id} "
+                f"(ttft {ttft_ms or 0:.0f} ms, total {total_ms:.0f} ms)"
+            )
+            
+            yield _sse_event("done", {
+                "context_used": len(user_context) > 0 or len(knowledge_context) > 0,
+                "suggestions": suggestions,
+                "ttft_ms": round(ttft_ms or 0, 2),
+                "total_ms": round(total_ms, 2)
+            })
+            
+        except asyncio.CancelledError:
+            logger.info(f"AI chat stream cancelled for user: {user_id}")
+            raise
+        except Exception as e:
+            logger.error(f"Error in AI chat stream: {e}")
+            yield _sse_event("error", {
+                "message": "I'm sorry, I encountered an error processing your request. Please try again."
+            })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/suggestions", response_model=dict)
 async def get_chat_suggestions(current_user: dict = Depends(get_current_user)):
     """Get chat suggestions for user"""
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, File, HTTPException, status, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError
 from models import (
     IncomeCreate, Income, ExpenseCreate, Expense,
     InvestmentCreate, Investment, LoanCreate, Loan,
@@ -7,9 +10,16 @@ from models import (
     GoalCreate, Goal
 )
 from auth import get_current_user
+from config import settings
 from database import get_database
-from rag_system import vector_store
+from indexing import vector_index_queue
+from response_cache import response_cache
 from utils import prepare_document_for_mongo, prepare_document_for_vector_store
+from rollups import apply_rollup_changes
+from pagination import NEXT_CURSOR_HEADER, paginate
+from serialization import OWNER_PROJECTION, FastJSONResponse
+from export import stream_export
+from statement_import import statement_imports
 from datetime import datetime, date
 import logging
 
@@ -39,12 +49,14 @@ async def add_income(
         
         # Insert to database
         result = await db.income.insert_one(income_doc)
+        await apply_rollup_changes(db, user_id, "income", added=[income_doc])
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(income_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "income", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "income", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Income added for user: {user_id}")
         
@@ -63,7 +75,8 @@ async def add_income(
 @router.get("/income", response_model=List[dict])
 async def get_income(
     current_user: dict = Depends(get_current_user),
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user income records"""
@@ -71,17 +84,17 @@ async def get_income(
         db = get_database()
         user_id = current_user["sub"]
         
-        cursor = db.income.find(
-            {"user_id": user_id}
-        ).sort("date", -1).skip(skip).limit(limit)
-        
-        income_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
-            income_records.append(record)
+        records, next_cursor = await paginate(
+            db.income, {"user_id": user_id}, "date", -1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        return income_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching income: {e}")
         raise HTTPException(
@@ -124,6 +137,18 @@ async def update_income(
             {"_id": ObjectId(income_id)},
             {"$set": update_doc}
         )
+        await apply_rollup_changes(
+            db, user_id, "income",
+            added=[{**existing, **update_doc}],
+            removed=[existing]
+        )
+        
+        # Re-embed the record under its Mongo _id
+        vector_doc = prepare_document_for_vector_store(income_data.dict())
+        vector_doc["user_id"] = user_id
+        vector_doc["created_at"] = existing.get("created_at", datetime.utcnow())
+        await vector_index_queue.enqueue(db, user_id, "income", vector_doc, record_id=existing["_id"])
+        response_cache.bump_version(user_id)
         
         logger.info(f"Income {income_id} updated for user: {user_id}")
         
@@ -160,6 +185,11 @@ async def delete_income(
             )
         
         await db.income.delete_one({"_id": ObjectId(income_id)})
+        await apply_rollup_changes(db, user_id, "income", removed=[existing])
+        
+        # Remove the record's vector
+        await vector_index_queue.enqueue(db, user_id, "income", None, record_id=existing["_id"], op="delete")
+        response_cache.bump_version(user_id)
         
         logger.info(f"Income {income_id} deleted for user: {user_id}")
         
@@ -195,12 +225,14 @@ async def add_expense(
         
         # Insert to database
         result = await db.expenses.insert_one(expense_doc)
+        await apply_rollup_changes(db, user_id, "expense", added=[expense_doc])
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(expense_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "expense", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "expense", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Expense added for user: {user_id}")
         
@@ -220,7 +252,8 @@ async def add_expense(
 async def get_expenses(
     current_user: dict = Depends(get_current_user),
     category: Optional[str] = Query(default=None),
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user expense records"""
@@ -233,15 +266,17 @@ async def get_expenses(
         if category:
             query["category"] = category
         
-        cursor = db.expenses.find(query).sort("date", -1).skip(skip).limit(limit)
-        
-        expense_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
-            expense_records.append(record)
+        records, next_cursor = await paginate(
+            db.expenses, query, "date", -1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        return expense_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching expenses: {e}")
         raise HTTPException(
@@ -284,6 +319,18 @@ async def update_expense(
             {"_id": ObjectId(expense_id)},
             {"$set": update_doc}
         )
+        await apply_rollup_changes(
+            db, user_id, "expense",
+            added=[{**existing, **update_doc}],
+            removed=[existing]
+        )
+        
+        # Re-embed the record under its Mongo _id
+        vector_doc = prepare_document_for_vector_store(expense_data.dict())
+        vector_doc["user_id"] = user_id
+        vector_doc["created_at"] = existing.get("created_at", datetime.utcnow())
+        await vector_index_queue.enqueue(db, user_id, "expense", vector_doc, record_id=existing["_id"])
+        response_cache.bump_version(user_id)
         
         logger.info(f"Expense {expense_id} updated for user: {user_id}")
         
@@ -320,6 +367,11 @@ async def delete_expense(
             )
         
         await db.expenses.delete_one({"_id": ObjectId(expense_id)})
+        await apply_rollup_changes(db, user_id, "expense", removed=[existing])
+        
+        # Remove the record's vector
+        await vector_index_queue.enqueue(db, user_id, "expense", None, record_id=existing["_id"], op="delete")
+        response_cache.bump_version(user_id)
         
         logger.info(f"Expense {expense_id} deleted for user: {user_id}")
         
@@ -356,11 +408,12 @@ async def add_investment(
         # Insert to database
         result = await db.investments.insert_one(investment_doc)
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(investment_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "investment", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "investment", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Investment added for user: {user_id}")
         
@@ -380,7 +433,8 @@ async def add_investment(
 async def get_investments(
     current_user: dict = Depends(get_current_user),
     investment_type: Optional[str] = Query(default=None),
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user investment records"""
@@ -393,15 +447,17 @@ async def get_investments(
         if investment_type:
             query["type"] = investment_type
         
-        cursor = db.investments.find(query).sort("date", -1).skip(skip).limit(limit)
-        
-        investment_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
-            investment_records.append(record)
+        records, next_cursor = await paginate(
+            db.investments, query, "date", -1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        return investment_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching investments: {e}")
         raise HTTPException(
@@ -445,6 +501,13 @@ async def update_investment(
             {"$set": update_doc}
         )
         
+        # Re-embed the record under its Mongo _id
+        vector_doc = prepare_document_for_vector_store(investment_data.dict())
+        vector_doc["user_id"] = user_id
+        vector_doc["created_at"] = existing.get("created_at", datetime.utcnow())
+        await vector_index_queue.enqueue(db, user_id, "investment", vector_doc, record_id=existing["_id"])
+        response_cache.bump_version(user_id)
+        
         logger.info(f"Investment {investment_id} updated for user: {user_id}")
         
         return {"message": "Investment updated successfully"}
@@ -481,6 +544,10 @@ async def delete_investment(
         
         await db.investments.delete_one({"_id": ObjectId(investment_id)})
         
+        # Remove the record's vector
+        await vector_index_queue.enqueue(db, user_id, "investment", None, record_id=existing["_id"], op="delete")
+        response_cache.bump_version(user_id)
+        
         logger.info(f"Investment {investment_id} deleted for user: {user_id}")
         
         return {"message": "Investment deleted successfully"}
@@ -516,11 +583,12 @@ async def add_loan(
         # Insert to database
         result = await db.loans.insert_one(loan_doc)
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(loan_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "loan", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "loan", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Loan added for user: {user_id}")
         
@@ -539,7 +607,8 @@ async def add_loan(
 @router.get("/loans", response_model=List[dict])
 async def get_loans(
     current_user: dict = Depends(get_current_user),
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user loan records"""
@@ -547,17 +616,17 @@ async def get_loans(
         db = get_database()
         user_id = current_user["sub"]
         
-        cursor = db.loans.find(
-            {"user_id": user_id}
-        ).sort("start_date", -1).skip(skip).limit(limit)
-        
-        loan_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
-            loan_records.append(record)
+        records, next_cursor = await paginate(
+            db.loans, {"user_id": user_id}, "start_date", -1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        return loan_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching loans: {e}")
         raise HTTPException(
@@ -601,6 +670,13 @@ async def update_loan(
             {"$set": update_doc}
         )
         
+        # Re-embed the record under its Mongo _id
+        vector_doc = prepare_document_for_vector_store(loan_data.dict())
+        vector_doc["user_id"] = user_id
+        vector_doc["created_at"] = existing.get("created_at", datetime.utcnow())
+        await vector_index_queue.enqueue(db, user_id, "loan", vector_doc, record_id=existing["_id"])
+        response_cache.bump_version(user_id)
+        
         logger.info(f"Loan {loan_id} updated for user: {user_id}")
         
         return {"message": "Loan updated successfully"}
@@ -637,6 +713,10 @@ async def delete_loan(
         
         await db.loans.delete_one({"_id": ObjectId(loan_id)})
         
+        # Remove the record's vector
+        await vector_index_queue.enqueue(db, user_id, "loan", None, record_id=existing["_id"], op="delete")
+        response_cache.bump_version(user_id)
+        
         logger.info(f"Loan {loan_id} deleted for user: {user_id}")
         
         return {"message": "Loan deleted successfully"}
@@ -672,11 +752,12 @@ async def add_insurance(
         # Insert to database
         result = await db.insurance.insert_one(insurance_doc)
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(insurance_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "insurance", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "insurance", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Insurance added for user: {user_id}")
         
@@ -695,7 +776,8 @@ async def add_insurance(
 @router.get("/insurance", response_model=List[dict])
 async def get_insurance(
     current_user: dict = Depends(get_current_user),
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user insurance records"""
@@ -703,17 +785,17 @@ async def get_insurance(
         db = get_database()
         user_id = current_user["sub"]
         
-        cursor = db.insurance.find(
-            {"user_id": user_id}
-        ).sort("start_date", -1).skip(skip).limit(limit)
-        
-        insurance_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
-            insurance_records.append(record)
+        records, next_cursor = await paginate(
+            db.insurance, {"user_id": user_id}, "start_date", -1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        return insurance_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching insurance: {e}")
         raise HTTPException(
@@ -757,11 +839,12 @@ async def create_budget(
         # Insert to database
         result = await db.budgets.insert_one(budget_doc)
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(budget_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "budget", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "budget", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Budget created for user: {user_id}")
         
@@ -782,7 +865,8 @@ async def create_budget(
 @router.get("/budgets", response_model=List[dict])
 async def get_budgets(
     current_user: dict = Depends(get_current_user),
-    limit: int = Query(default=12, le=24),
+    limit: int = Query(default=12, ge=1, le=120),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user budgets"""
@@ -790,17 +874,17 @@ async def get_budgets(
         db = get_database()
         user_id = current_user["sub"]
         
-        cursor = db.budgets.find(
-            {"user_id": user_id}
-        ).sort("month", -1).skip(skip).limit(limit)
-        
-        budget_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
-            budget_records.append(record)
+        records, next_cursor = await paginate(
+            db.budgets, {"user_id": user_id}, "month", -1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        return budget_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching budgets: {e}")
         raise HTTPException(
@@ -832,11 +916,12 @@ async def create_goal(
         # Insert to database
         result = await db.goals.insert_one(goal_doc)
         
-        # Add to vector store (prepare a separate document with simple types)
+        # Queue vector indexing (prepare a separate document with simple types)
         vector_doc = prepare_document_for_vector_store(goal_data.dict())
         vector_doc["user_id"] = user_id
         vector_doc["created_at"] = datetime.utcnow()
-        await vector_store.add_user_data(user_id, "goal", vector_doc)
+        await vector_index_queue.enqueue(db, user_id, "goal", vector_doc, record_id=result.inserted_id)
+        response_cache.bump_version(user_id)
         
         logger.info(f"Goal created for user: {user_id}")
         
@@ -855,7 +940,8 @@ async def create_goal(
 @router.get("/goals", response_model=List[dict])
 async def get_goals(
     current_user: dict = Depends(get_current_user),
-    limit: int = Query(default=20, le=50),
+    limit: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="Token from the previous page's X-Next-Cursor header"),
     skip: int = Query(default=0, ge=0)
 ):
     """Get user goals"""
@@ -863,25 +949,267 @@ async def get_goals(
         db = get_database()
         user_id = current_user["sub"]
         
-        cursor = db.goals.find(
-            {"user_id": user_id}
-        ).sort("target_date", 1).skip(skip).limit(limit)
+        records, next_cursor = await paginate(
+            db.goals, {"user_id": user_id}, "target_date", 1, limit, cursor, skip, projection=OWNER_PROJECTION
+        )
         
-        goal_records = []
-        async for record in cursor:
-            record["_id"] = str(record["_id"])
+        for record in records:
             # Calculate progress percentage
             if record["target_amount"] > 0:
                 record["progress_percentage"] = (record["current_amount"] / record["target_amount"]) * 100
             else:
                 record["progress_percentage"] = 0
-            goal_records.append(record)
         
-        return goal_records
+        return FastJSONResponse(records, headers={NEXT_CURSOR_HEADER: next_cursor or ""})
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching goals: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
+
+# Bulk Routes
+# Record type (path segment) -> (create model, collection, vector data_type, rollup kind, field unique per user)
+RECORD_TYPES = {
+    "income": (IncomeCreate, "income", "income", "income", None),
+    "expenses": (ExpenseCreate, "expenses", "expense", "expense", None),
+    "investments": (InvestmentCreate, "investments", "investment", None, None),
+    "loans": (LoanCreate, "loans", "loan", None, None),
+    "insurance": (InsuranceCreate, "insurance", "insurance", None, None),
+    "budgets": (BudgetCreate, "budgets", "budget", None, "month"),
+    "goals": (GoalCreate, "goals", "goal", None, None),
+}
+
+def _validate_bulk_items(model, items: List[Any]):
+    """Validate every item in one pass; returns (valid index -> model, index -> errors)"""
+    errors: Dict[int, List[Dict[str, Any]]] = {}
+    try:
+        valid = TypeAdapter(List[model]).validate_python(items)
+        return dict(enumerate(valid)), errors
+    except ValidationError as e:
+        for error in e.errors(include_url=False, include_context=False, include_input=False):
+            errors.setdefault(error["loc"][0], []).append({
+                "loc": list(error["loc"][1:]),
+                "msg": error["msg"]
+            })
+    
+    valid_indexes = [i for i in range(len(items)) if i not in errors]
+    valid = TypeAdapter(List[model]).validate_python([items[i] for i in valid_indexes])
+    return dict(zip(valid_indexes, valid)), errors
+
+@router.post("/{record_type}/bulk", response_model=dict)
+async def bulk_add_records(
+    record_type: str,
+    items: List[Any] = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Add many records of one type in a single request.
+    
+    Items are validated individually; invalid items are reported by index
+    and the rest are inserted.
+    """
+    if record_type not in RECORD_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown record type: {record_type}"
+        )
+    if len(items) > settings.FINANCE_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.FINANCE_BULK_MAX_ITEMS} items per request"
+        )
+    
+    model, collection_name, data_type, rollup_kind, unique_field = RECORD_TYPES[record_type]
+    
+    try:
+        db = get_database()
+        user_id = current_user["sub"]
+        collection = getattr(db, collection_name)
+        
+        valid, errors = _validate_bulk_items(model, items)
+        
+        # Records that must be unique per user (one budget per month)
+        if unique_field and valid:
+            values = [getattr(record, unique_field) for record in valid.values()]
+            taken = set(await collection.distinct(unique_field, {"user_id": user_id, unique_field: {"$in": values}}))
+            for i, record in list(valid.items()):
+                value = getattr(record, unique_field)
+                if value in taken:
+                    errors.setdefault(i, []).append({"loc": [unique_field], "msg": f"Duplicate {unique_field}: {value}"})
+                    del valid[i]
+                taken.add(value)
+        
+        now = datetime.utcnow()
+        indexes = sorted(valid)
+        docs = [
+            prepare_document_for_mongo({"user_id": user_id, **valid[i].dict(), "created_at": now})
+            for i in indexes
+        ]
+        
+        # Unordered insert: one failing document does not stop the rest
+        failed_positions = set()
+        if docs:
+            try:
+                await collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    failed_positions.add(write_error["index"])
+                    errors.setdefault(indexes[write_error["index"]], []).append({"loc": [], "msg": write_error["errmsg"]})
+        
+        inserted = [(i, doc) for position, (i, doc) in enumerate(zip(indexes, docs)) if position not in failed_positions]
+        
+        if inserted:
+            if rollup_kind:
+                await apply_rollup_changes(db, user_id, rollup_kind, added=[doc for _, doc in inserted])
+            
+            # Queue vector indexing for every inserted record in one outbox write
+            entries = []
+            for i, doc in inserted:
+                vector_doc = prepare_document_for_vector_store(valid[i].dict())
+                vector_doc["user_id"] = user_id
+                vector_doc["created_at"] = now
+                entries.append({
+                    "user_id": user_id,
+                    "data_type": data_type,
+                    "data": vector_doc,
+                    "record_id": doc["_id"],
+                    "op": "upsert",
+                })
+            await vector_index_queue.enqueue_many(db, entries)
+            response_cache.bump_version(user_id)
+        
+        logger.info(f"Bulk {record_type} insert for user {user_id}: {len(inserted)} inserted, {len(errors)} failed")
+        
+        ids: List[Optional[str]] = [None] * len(items)
+        for i, doc in inserted:
+            ids[i] = str(doc["_id"])
+        
+        return {
+            "message": f"{len(inserted)} of {len(items)} {record_type} records added",
+            "inserted": len(inserted),
+            "failed": len(errors),
+            "ids": ids,
+            "errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error bulk adding {record_type}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+# Statement Import Routes
+@router.post("/import/statement", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def import_statement(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Upload a bank statement CSV; it is imported in the background"""
+    try:
+        db = get_database()
+        user_id = current_user["sub"]
+        
+        job_id = await statement_imports.start(
+            db, user_id, file, max_bytes=settings.STATEMENT_IMPORT_MAX_MB * 1024 * 1024
+        )
+        
+        logger.info(f"Statement import {job_id} started for user: {user_id}")
+        
+        return {
+            "message": "Statement import started",
+            "job_id": job_id
+        }
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error starting statement import: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/import/{job_id}", response_model=dict)
+async def get_import_progress(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the progress of a statement import"""
+    try:
+        from bson import ObjectId
+        
+        db = get_database()
+        user_id = current_user["sub"]
+        
+        if not ObjectId.is_valid(job_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid import job ID"
+            )
+        
+        job = await statement_imports.get(db, user_id, job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Import job not found"
+            )
+        
+        return job
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching import progress: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+# Export Routes
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@router.get("/export")
+async def export_records(
+    current_user: dict = Depends(get_current_user),
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    types: Optional[str] = Query(default=None, description="Comma-separated record types (default: all)")
+):
+    """Stream all of the user's financial records as NDJSON or CSV"""
+    record_types = [name.strip() for name in types.split(",") if name.strip()] if types else list(RECORD_TYPES)
+    unknown = [name for name in record_types if name not in RECORD_TYPES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown record types: {', '.join(unknown)}"
+        )
+    
+    db = get_database()
+    user_id = current_user["sub"]
+    sources = [(name, RECORD_TYPES[name][1], RECORD_TYPES[name][0]) for name in record_types]
+    
+    async def body():
+        try:
+            async for chunk in stream_export(db, user_id, sources, format, settings.EXPORT_BATCH_SIZE):
+                yield chunk
+            logger.info(f"Export completed for user: {user_id}")
+        except Exception as e:
+            # Headers are already sent, so the truncated body is the only signal
+            logger.error(f"Error exporting records for user {user_id}: {e}")
+            raise
+    
+    filename = f"finance-export-{datetime.utcnow():%Y%m%d}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,44 @@
+"""
+Fast JSON responses for list and analytics endpoints
+"""
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse
+
+# Mongo projection for records returned to their owner (user_id is implied by the token)
+OWNER_PROJECTION = {"user_id": 0}
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any):
+    """Types orjson does not know; datetime, date, dataclasses and numpy are native"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson, straight from Mongo documents.
+
+    ObjectId and datetime values are encoded in the same pass, so routes can
+    return raw documents without converting ``_id`` or going through
+    ``jsonable_encoder`` first.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
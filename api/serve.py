@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the Finance AI API
+
+Loads the embedding model once in a master process, then forks
+SERVER_WORKERS uvicorn workers sharing one listening socket, so the model
+weights are shared copy-on-write instead of loaded once per worker. With
+more than one worker:
+    - a single `chroma run` server owns CHROMA_PERSIST_DIRECTORY and every
+      worker talks to it over HTTP (an embedded PersistentClient cannot be
+      shared between processes);
+    - only worker 0 drains the vector outbox and writes the knowledge base
+      (VECTOR_INDEX_WRITER); the others follow its writes through the index
+      change feed.
+Workers that exit (crash, or SERVER_MAX_REQUESTS reached) are re-forked
+from the master. SIGTERM/SIGINT stop the workers gracefully.
+
+Usage:
+    python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+`python main.py` remains the single-process development server (reload).
+"""
+import argparse
+import gc
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import uvicorn
+
+from config import settings
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("serve")
+
+# A worker dying sooner than this after its start is respawned with a delay
+CRASH_LOOP_SECONDS = 5
+
+
+def start_chroma_server(port: int) -> subprocess.Popen:
+    """Run the Chroma server owning the persist directory and wait until it answers"""
+    command = shutil.which("chroma")
+    if command is None:
+        sys.exit("The `chroma` CLI (from the chromadb package) is required for more than one worker")
+    process = subprocess.Popen([
+        command, "run",
+        "--path", settings.CHROMA_PERSIST_DIRECTORY,
+        "--host", "127.0.0.1",
+        "--port", str(port),
+    ])
+
+    # The client knows which API version (and heartbeat path) its server speaks
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"Chroma server exited with code {process.returncode}")
+        try:
+            chromadb.HttpClient(
+                host="127.0.0.1", port=port, settings=ChromaSettings(anonymized_telemetry=False)
+            ).heartbeat()
+            logger.info(f"Chroma server ready on 127.0.0.1:{port} (pid {process.pid})")
+            return process
+        except Exception:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    sys.exit("Chroma server did not become ready within 60s")
+
+
+def preload_model():
+    """Load the embedding model into the master so workers inherit it"""
+    if settings.EMBEDDING_BACKEND != "torch":
+        # ONNX Runtime sessions own thread pools, which do not survive fork
+        logger.info(f"Not preloading the {settings.EMBEDDING_BACKEND} backend; each worker loads its own")
+        return
+    try:
+        import torch
+
+        # Keep the master single-threaded so no OpenMP pool exists at fork time
+        torch.set_num_threads(1)
+        from rag_system import vector_store
+
+        started = time.perf_counter()
+        vector_store.encoder
+        logger.info(f"Preloaded {settings.EMBEDDING_MODEL} in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.warning(f"Model preload failed, workers will load it themselves: {e}")
+
+
+def run_worker(app, index: int, workers: int, sock, config_kwargs: dict):
+    """Body of a forked worker process"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    if workers > 1:
+        settings.VECTOR_INDEX_WRITER = index == 0
+    if "torch" in sys.modules:
+        import torch
+        torch.set_num_threads(settings.SERVER_TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers))
+
+    server = uvicorn.Server(uvicorn.Config(app, **config_kwargs))
+    server.run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    chroma = None
+    if workers > 1 and not settings.CHROMA_SERVER_HOST:
+        chroma = start_chroma_server(settings.CHROMA_SERVER_PORT)
+        settings.CHROMA_SERVER_HOST = "127.0.0.1"
+
+    # Tokenizer threads started before fork would deadlock in the workers
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    if settings.SERVER_PRELOAD_MODEL:
+        preload_model()
+    # Import the app and everything it pulls in once, before forking
+    from main import app
+
+    config_kwargs = {
+        "host": args.host,
+        "port": args.port,
+        "backlog": settings.SERVER_BACKLOG,
+        "timeout_keep_alive": settings.SERVER_TIMEOUT_KEEP_ALIVE,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT,
+        "limit_concurrency": settings.SERVER_LIMIT_CONCURRENCY or None,
+        "limit_max_requests": settings.SERVER_MAX_REQUESTS or None,
+        "log_level": "info",
+    }
+    sock = uvicorn.Config(app=None, **config_kwargs).bind_socket()
+
+    # Objects alive now are shared by every worker; keep the collector from
+    # touching (and so copying) their pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}  # pid -> (worker index, started at)
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(app, index, workers, sock, config_kwargs)
+            except BaseException:
+                logger.exception(f"Worker {index} failed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = (index, time.monotonic())
+        logger.info(f"Worker {index} started (pid {pid}){' [vector writer]' if workers > 1 and index == 0 else ''}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if not stopping:
+            logger.info(f"Received {signal.Signals(signum).name}, stopping {len(children)} workers")
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"Serving on {args.host}:{args.port} with {workers} workers")
+    for index in range(workers):
+        spawn(index)
+
+    stop_deadline = None
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            if stopping:
+                stop_deadline = stop_deadline or time.monotonic() + settings.SERVER_GRACEFUL_TIMEOUT + 5
+                if time.monotonic() > stop_deadline:
+                    for child in list(children):
+                        os.kill(child, signal.SIGKILL)
+            time.sleep(0.2)
+            continue
+
+        if chroma is not None and pid == chroma.pid:
+            logger.error("Chroma server exited; shutting down")
+            chroma = None
+            stop(signal.SIGTERM, None)
+            continue
+        if pid not in children:
+            continue
+
+        index, started_at = children.pop(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code == 0:
+            logger.info(f"Worker {index} (pid {pid}) recycled")
+        else:
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {code}; restarting")
+            if time.monotonic() - started_at < CRASH_LOOP_SECONDS:
+                time.sleep(1)
+        spawn(index)
+
+    if chroma is not None:
+        chroma.terminate()
+        try:
+            chroma.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            chroma.kill()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
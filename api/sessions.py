@@ -0,0 +1,125 @@
+"""
+Server-side sessions behind rotating refresh tokens
+"""
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+
+from config import settings
+from token_cache import revocation_filter
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_secret(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _parse_token(token: str) -> Optional[Tuple[ObjectId, str]]:
+    session_id, _, secret = (token or "").partition(".")
+    try:
+        return ObjectId(session_id), secret
+    except (InvalidId, TypeError):
+        return None
+
+
+class SessionStore:
+    """Refresh-token sessions in the ``sessions`` collection.
+
+    A refresh token is ``<session id>.<secret>``; only a SHA-256 of the
+    secret is stored. Renewing access is a single find-and-update on
+    ``_id``, with no password hash involved. Each refresh replaces the
+    secret (rotation); presenting the previous secret again means the
+    token was copied, and the whole session is revoked. Access tokens carry
+    the session ID (``sid``), and revocations are pushed to the
+    revocation filter checked by get_current_user. Expired sessions are
+    removed by a TTL index on ``expires_at``.
+    """
+
+    def __init__(self, ttl_days: int = 30):
+        self.ttl = timedelta(days=ttl_days)
+
+    async def create(self, db, user_id: str, email: str, user_agent: Optional[str] = None) -> Tuple[str, str]:
+        """Start a session; returns (session ID, first refresh token)"""
+        secret = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        result = await db.sessions.insert_one({
+            "user_id": user_id,
+            "email": email,
+            "token_hash": _hash_secret(secret),
+            "previous_token_hash": None,
+            "user_agent": user_agent,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": now + self.ttl,
+            "revoked_at": None,
+        })
+        return str(result.inserted_id), f"{result.inserted_id}.{secret}"
+
+    async def rotate(self, db, token: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Exchange a refresh token for (session, new refresh token).
+
+        Returns None for unknown, expired, revoked or reused tokens.
+        """
+        parsed = _parse_token(token)
+        if parsed is None:
+            return None
+        session_id, secret = parsed
+        presented = _hash_secret(secret)
+        new_secret = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+
+        session = await db.sessions.find_one_and_update(
+            {"_id": session_id, "token_hash": presented, "revoked_at": None, "expires_at": {"$gt": now}},
+            {"$set": {"token_hash": _hash_secret(new_secret), "previous_token_hash": presented, "last_used_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if session is not None:
+            return session, f"{session_id}.{new_secret}"
+
+        # A rotated-out token coming back means it leaked: end the session
+        reused = await db.sessions.update_one(
+            {"_id": session_id, "previous_token_hash": presented, "revoked_at": None},
+            {"$set": {"revoked_at": now, "revoked_reason": "token_reuse"}},
+        )
+        if reused.modified_count:
+            revocation_filter.add(str(session_id))
+            logger.warning(f"Refresh token reuse detected, revoked session {session_id}")
+        return None
+
+    async def revoke(self, db, token: str) -> bool:
+        """Revoke the session a refresh token belongs to"""
+        parsed = _parse_token(token)
+        if parsed is None:
+            return False
+        session_id, secret = parsed
+        result = await db.sessions.update_one(
+            {"_id": session_id, "token_hash": _hash_secret(secret), "revoked_at": None},
+            {"$set": {"revoked_at": datetime.utcnow(), "revoked_reason": "logout"}},
+        )
+        if result.modified_count:
+            revocation_filter.add(str(session_id))
+        return result.modified_count > 0
+
+    async def revoke_all(self, db, user_id: str) -> int:
+        """Revoke every active session of a user; returns how many"""
+        session_ids = await db.sessions.distinct("_id", {"user_id": user_id, "revoked_at": None})
+        if not session_ids:
+            return 0
+        result = await db.sessions.update_many(
+            {"_id": {"$in": session_ids}, "revoked_at": None},
+            {"$set": {"revoked_at": datetime.utcnow(), "revoked_reason": "logout_all"}},
+        )
+        for session_id in session_ids:
+            revocation_filter.add(str(session_id))
+        return result.modified_count
+
+
+# Initialize global instance
+session_store = SessionStore(ttl_days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
@@ -0,0 +1,309 @@
+"""
+Background import of bank-statement CSV files into income and expense records
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import re
+import tempfile
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pydantic import ValidationError
+
+from config import settings
+from indexing import vector_index_queue
+from models import ExpenseCategory, ExpenseCreate, IncomeCreate, IncomeSource
+from response_cache import response_cache
+from rollups import apply_rollup_changes
+from utils import prepare_document_for_mongo, prepare_document_for_vector_store
+
+logger = logging.getLogger(__name__)
+
+# Header names used by common bank exports, per logical column
+COLUMN_ALIASES = {
+    "date": ["date", "transaction date", "txn date", "value date", "posting date", "tran date"],
+    "description": ["description", "narration", "particulars", "details", "remarks", "transaction details"],
+    "amount": ["amount", "transaction amount", "amount (inr)"],
+    "type": ["type", "dr/cr", "cr/dr", "transaction type", "debit/credit"],
+    "debit": ["debit", "withdrawal", "withdrawal amount", "withdrawal amt", "debit amount", "withdrawals"],
+    "credit": ["credit", "deposit", "deposit amount", "deposit amt", "credit amount", "deposits"],
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d.%m.%Y")
+
+# Description keywords -> expense category / income source
+EXPENSE_KEYWORDS = {
+    ExpenseCategory.FOOD: ["swiggy", "zomato", "restaurant", "cafe", "grocery", "bigbasket", "blinkit", "zepto", "dmart", "food"],
+    ExpenseCategory.RENT: ["rent", "landlord", "nobroker"],
+    ExpenseCategory.TRANSPORT: ["uber", "ola", "rapido", "irctc", "metro", "fuel", "petrol", "fastag", "indigo", "airline"],
+    ExpenseCategory.UTILITIES: ["electricity", "bescom", "water", "gas", "broadband", "airtel", "jio", "recharge", "bill"],
+    ExpenseCategory.ENTERTAINMENT: ["netflix", "prime video", "hotstar", "spotify", "bookmyshow", "pvr", "inox"],
+    ExpenseCategory.SHOPPING: ["amazon", "flipkart", "myntra", "ajio", "nykaa", "mall"],
+    ExpenseCategory.HEALTHCARE: ["pharmacy", "hospital", "clinic", "apollo", "medplus", "1mg", "diagnostic"],
+    ExpenseCategory.EDUCATION: ["school", "college", "tuition", "course", "udemy", "coursera", "fees"],
+}
+
+INCOME_KEYWORDS = {
+    IncomeSource.SALARY: ["salary", "sal ", "payroll"],
+    IncomeSource.INVESTMENT: ["dividend", "interest", "int.pd", "redemption"],
+    IncomeSource.RENTAL: ["rent"],
+    IncomeSource.FREELANCE: ["freelance", "upwork", "fiverr", "consulting"],
+}
+
+
+def _match_keyword(description: str, keywords: Dict[Any, List[str]], default):
+    text = description.lower()
+    for value, words in keywords.items():
+        if any(word in text for word in words):
+            return value
+    return default
+
+
+def _parse_date(value: str) -> Optional[date]:
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value: str) -> Optional[float]:
+    cleaned = re.sub(r"[^\d.\-]", "", (value or "").replace(",", ""))
+    if cleaned in ("", "-", ".", "-."):
+        return None
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, int]:
+    normalized = [column.strip().lower() for column in header]
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[name] = normalized.index(alias)
+                break
+    if "date" not in columns or not ("amount" in columns or "debit" in columns or "credit" in columns):
+        raise ValueError(f"Unrecognised statement header: {header}")
+    return columns
+
+
+def map_statement_row(row: List[str], columns: Dict[str, int]) -> Tuple[str, Dict[str, Any]]:
+    """Map one CSV row to ("expense" | "income", create-model fields)"""
+    def cell(name: str) -> str:
+        index = columns.get(name)
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    description = cell("description")
+    row_date = _parse_date(cell("date"))
+    if row_date is None:
+        raise ValueError(f"Unparseable date: {cell('date')!r}")
+
+    debit, credit = _parse_amount(cell("debit")), _parse_amount(cell("credit"))
+    if debit:
+        kind, amount = "expense", abs(debit)
+    elif credit:
+        kind, amount = "income", abs(credit)
+    else:
+        amount = _parse_amount(cell("amount"))
+        if not amount:
+            raise ValueError("Row has no amount")
+        # Direction from a type column, or a Cr/Dr suffix on the amount
+        direction = cell("type").lower() or re.sub(r"[^a-z]", "", cell("amount").lower())
+        if direction.startswith(("cr", "credit", "deposit")):
+            kind = "income"
+        elif direction.startswith(("dr", "debit", "withdrawal")):
+            kind = "expense"
+        else:
+            kind = "expense" if amount < 0 else "income"
+        amount = abs(amount)
+
+    if kind == "expense":
+        return kind, {
+            "category": _match_keyword(description, EXPENSE_KEYWORDS, ExpenseCategory.OTHER),
+            "amount": amount,
+            "description": description or None,
+            "date": row_date,
+        }
+    return kind, {
+        "source": _match_keyword(description, INCOME_KEYWORDS, IncomeSource.OTHER),
+        "amount": amount,
+        "description": description or None,
+        "date": row_date,
+        "frequency": "one-time",
+    }
+
+
+class StatementImports:
+    """Runs statement imports as background tasks, with progress in ``import_jobs``.
+
+    The uploaded file is spooled to disk, then read one batch of rows at a
+    time in a worker thread, so neither the file nor the parsed rows are
+    ever held in memory as a whole and the event loop stays free.
+    """
+
+    def __init__(self, batch_size: int = 500, max_errors: int = 50):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self, db, user_id: str, upload, max_bytes: int) -> str:
+        """Spool an upload to disk in chunks and start importing it; returns the job ID"""
+        os.makedirs(settings.STATEMENT_IMPORT_DIR, exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix=".csv", dir=settings.STATEMENT_IMPORT_DIR)
+        size = 0
+        try:
+            with os.fdopen(handle, "wb") as spool:
+                while chunk := await upload.read(1024 * 1024):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"Statement exceeds {max_bytes // (1024 * 1024)} MB")
+                    await asyncio.to_thread(spool.write, chunk)
+        except Exception:
+            os.remove(path)
+            raise
+
+        now = datetime.utcnow()
+        result = await db.import_jobs.insert_one({
+            "user_id": user_id,
+            "filename": upload.filename,
+            "status": "queued",
+            "bytes_total": size,
+            "bytes_processed": 0,
+            "rows_processed": 0,
+            "expenses_inserted": 0,
+            "income_inserted": 0,
+            "rows_failed": 0,
+            "errors": [],
+            "created_at": now,
+            "updated_at": now,
+        })
+        job_id = str(result.inserted_id)
+        task = asyncio.create_task(self._run(db, job_id, user_id, path, size))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return job_id
+
+    async def get(self, db, user_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await db.import_jobs.find_one({"_id": ObjectId(job_id), "user_id": user_id})
+        if job is None:
+            return None
+        job["_id"] = str(job["_id"])
+        job["progress"] = round(job["bytes_processed"] / job["bytes_total"], 4) if job["bytes_total"] else 1.0
+        return job
+
+    async def stop(self):
+        """Cancel running imports (they are marked as interrupted)"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _update(self, db, job_id: str, update: Dict[str, Any]):
+        update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        await db.import_jobs.update_one({"_id": ObjectId(job_id)}, update)
+
+    async def _run(self, db, job_id: str, user_id: str, path: str, size: int):
+        binary = open(path, "rb")
+        try:
+            await self._update(db, job_id, {"$set": {"status": "running"}})
+            text = io.TextIOWrapper(binary, encoding="utf-8-sig", errors="replace", newline="")
+            reader = csv.reader(text)
+            header = await asyncio.to_thread(next, reader, None)
+            if header is None:
+                raise ValueError("Statement is empty")
+            columns = _resolve_columns(header)
+
+            line = 1
+            while True:
+                rows = await asyncio.to_thread(lambda: list(islice(reader, self.batch_size)))
+                if not rows:
+                    break
+                counts, errors = await self._import_batch(db, user_id, rows, columns, first_line=line + 1)
+                line += len(rows)
+
+                update = {
+                    "$set": {"bytes_processed": min(binary.tell(), size)},
+                    "$inc": {"rows_processed": len(rows), "rows_failed": len(errors), **counts},
+                }
+                if errors:
+                    update["$push"] = {"errors": {"$each": errors, "$slice": self.max_errors}}
+                await self._update(db, job_id, update)
+
+            await self._update(db, job_id, {"$set": {
+                "status": "completed",
+                "bytes_processed": size,
+                "finished_at": datetime.utcnow(),
+            }})
+            logger.info(f"Statement import {job_id} completed for user {user_id}")
+
+        except asyncio.CancelledError:
+            await self._update(db, job_id, {"$set": {"status": "interrupted", "finished_at": datetime.utcnow()}})
+            raise
+        except Exception as e:
+            logger.error(f"Statement import {job_id} failed: {e}")
+            await self._update(db, job_id, {"$set": {
+                "status": "failed",
+                "error": str(e),
+                "finished_at": datetime.utcnow(),
+            }})
+        finally:
+            binary.close()
+            os.remove(path)
+
+    async def _import_batch(self, db, user_id: str, rows: List[List[str]], columns: Dict[str, int], first_line: int):
+        """Validate and insert one batch of rows; returns counter increments and row errors"""
+        records = {"expense": [], "income": []}
+        errors = []
+        for offset, row in enumerate(rows):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                kind, fields = map_statement_row(row, columns)
+                model = ExpenseCreate if kind == "expense" else IncomeCreate
+                records[kind].append(model(**fields))
+            except (ValueError, ValidationError) as e:
+                errors.append({"line": first_line + offset, "error": str(e).splitlines()[0]})
+
+        now = datetime.utcnow()
+        counts = {}
+        entries = []
+        for kind, collection_name, counter in (("expense", "expenses", "expenses_inserted"), ("income", "income", "income_inserted")):
+            if not records[kind]:
+                continue
+            docs = [
+                prepare_document_for_mongo({"user_id": user_id, **record.dict(), "created_at": now})
+                for record in records[kind]
+            ]
+            await getattr(db, collection_name).insert_many(docs, ordered=False)
+            await apply_rollup_changes(db, user_id, kind, added=docs)
+            counts[counter] = len(docs)
+
+            for record, doc in zip(records[kind], docs):
+                vector_doc = prepare_document_for_vector_store(record.dict())
+                vector_doc["user_id"] = user_id
+                vector_doc["created_at"] = now
+                entries.append({
+                    "user_id": user_id,
+                    "data_type": kind,
+                    "data": vector_doc,
+                    "record_id": doc["_id"],
+                    "op": "upsert",
+                })
+
+        if entries:
+            await vector_index_queue.enqueue_many(db, entries)
+            response_cache.bump_version(user_id)
+        return counts, errors
+
+
+# Initialize global instance
+statement_imports = StatementImports(batch_size=settings.STATEMENT_IMPORT_BATCH_SIZE)
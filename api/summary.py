@@ -0,0 +1,86 @@
+"""
+Shared financial summary queries for analytics and the RAG chat context
+"""
+import asyncio
+from datetime import date
+from typing import Any, Dict
+
+from utils import prepare_date_range_for_mongo
+
+
+async def _first(cursor) -> Dict[str, Any]:
+    result = await cursor.to_list(1)
+    return result[0] if result else {}
+
+
+def _total(facet_result: list, field: str = "total") -> float:
+    return facet_result[0][field] if facet_result else 0
+
+
+async def get_financial_snapshot(db, user_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+    """Get a user's financial figures with one $facet round trip per collection.
+
+    The four collections are queried concurrently, so the whole snapshot
+    costs about one database round trip.
+    """
+    date_range = prepare_date_range_for_mongo(start_date, end_date)
+
+    income_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "period_total": [
+                {"$match": {"date": date_range}},
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            ],
+            "recent": [
+                {"$sort": {"date": -1}},
+                {"$limit": 5},
+                {"$project": {"_id": 0, "source": 1, "amount": 1, "date": 1}}
+            ]
+        }}
+    ]
+
+    expense_pipeline = [
+        {"$match": {"user_id": user_id, "date": date_range}},
+        {"$facet": {
+            "period_total": [
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            ],
+            "top_categories": [
+                {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}},
+                {"$sort": {"total": -1}},
+                {"$limit": 5}
+            ]
+        }}
+    ]
+
+    investment_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": "$amount"},
+            "current_value": {"$sum": {"$ifNull": ["$current_value", "$amount"]}}
+        }}
+    ]
+
+    loan_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "total": {"$sum": "$outstanding"}}}
+    ]
+
+    income, expenses, investments, loans = await asyncio.gather(
+        _first(db.income.aggregate(income_pipeline)),
+        _first(db.expenses.aggregate(expense_pipeline)),
+        _first(db.investments.aggregate(investment_pipeline)),
+        _first(db.loans.aggregate(loan_pipeline))
+    )
+
+    return {
+        "total_income": _total(income.get("period_total", [])),
+        "total_expenses": _total(expenses.get("period_total", [])),
+        "total_investments": investments.get("total", 0),
+        "current_investment_value": investments.get("current_value", 0),
+        "total_loans": loans.get("total", 0),
+        "recent_income": income.get("recent", []),
+        "top_expense_categories": expenses.get("top_categories", [])
+    }
@@ -0,0 +1,41 @@
+"""
+Routing of chat questions between the shared answer cache and personal RAG
+"""
+import os
+import sys
+
+import pytest
+
+# Add the api directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from intent_router import classify_query
+
+
+@pytest.mark.parametrize("query", [
+    "How much emergency fund do I need?",
+    "Give me tax saving investment recommendations",
+    "What is a SIP?",
+    "Explain the old vs new tax regime",
+    "How does compound interest work?",
+    "What is the difference between PPF and EPF?",
+    "How do I file my ITR?",
+])
+def test_knowledge_questions_are_general(query):
+    assert classify_query(query) == "general"
+
+
+@pytest.mark.parametrize("query", [
+    "Can I afford a home loan of 50 lakh?",
+    "Should I invest more in mutual funds or stocks?",
+    "Is it a good time for me to buy gold?",
+    "What's my current financial summary?",
+    "Show me my investment portfolio performance",
+    "Which loan should I pay off first?",
+    "How can I improve my savings rate?",
+    "Am I on track to meet my financial goals?",
+    "How much did I spend on food this month?",
+    "What should we do about our home loan EMI?",
+])
+def test_questions_about_own_records_are_personal(query):
+    assert classify_query(query) == "personal"
@@ -0,0 +1,207 @@
+"""
+Verified access-token cache and revoked-session filter for get_current_user
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """LRU of verified JWT payloads keyed by SHA-256 of the token.
+
+    An entry lives until the token's own ``exp``, so a cached token is never
+    accepted after it would have failed ``jwt.decode``.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, expires_at = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return payload
+            del self._entries[key]
+        self._misses += 1
+        return None
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        self._entries[hashlib.sha256(token.encode()).digest()] = (payload, float(expires_at))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+        }
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on SHA-256)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.sha256(value.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationFilter:
+    """Revoked session IDs, checked on every authenticated request.
+
+    A Bloom filter of sessions revoked within the access-token lifetime
+    (older revocations only concern tokens that have already expired) is
+    rebuilt from Mongo every ``refresh_seconds``; revocations made by this
+    process are added immediately. A miss, the common case, costs no I/O.
+    A hit is confirmed once against ``sessions`` and remembered until the
+    next rebuild, so false positives never reject a valid token.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, refresh_seconds: float = 5.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.window = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        self._filter = BloomFilter(capacity, error_rate)
+        self._checked: Dict[str, bool] = {}
+        self._local: Dict[str, datetime] = {}
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._refreshed_at: Optional[datetime] = None
+        self._lookups = 0
+        self._confirmations = 0
+        self._false_positives = 0
+
+    def add(self, session_id: str):
+        """Mark a session revoked in this process"""
+        self._filter.add(session_id)
+        self._checked[session_id] = True
+        self._local[session_id] = datetime.utcnow()
+
+    async def is_revoked(self, session_id: Optional[str]) -> bool:
+        if not session_id:
+            return False
+        self._lookups += 1
+        if session_id not in self._filter:
+            return False
+        if session_id in self._checked:
+            return self._checked[session_id]
+        if self._db is None:
+            return True
+
+        self._confirmations += 1
+        try:
+            revoked = await self._db.sessions.find_one(
+                {"_id": ObjectId(session_id), "revoked_at": {"$ne": None}}, {"_id": 1}
+            ) is not None
+        except InvalidId:
+            revoked = False
+        if not revoked:
+            self._false_positives += 1
+        self._checked[session_id] = revoked
+        return revoked
+
+    async def refresh(self):
+        """Rebuild the filter from sessions revoked within the token lifetime"""
+        since = datetime.utcnow() - self.window
+        rebuilt = BloomFilter(self.capacity, self.error_rate)
+        async for session in self._db.sessions.find({"revoked_at": {"$gte": since}}, {"_id": 1}):
+            rebuilt.add(str(session["_id"]))
+        if rebuilt.count > self.capacity:
+            logger.warning(f"{rebuilt.count} revoked sessions exceed the revocation filter capacity ({self.capacity})")
+
+        # Keep local revocations the query may not see yet (e.g. a lagging secondary)
+        self._local = {session_id: at for session_id, at in self._local.items() if at >= since}
+        for session_id in self._local:
+            rebuilt.add(session_id)
+        self._filter = rebuilt
+        self._checked = {session_id: True for session_id in self._local}
+        self._refreshed_at = datetime.utcnow()
+
+    def start(self, db):
+        """Start the periodic refresh on the running event loop"""
+        if self._task and not self._task.done():
+            return
+        self._db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Revocation filter refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revoked_sessions": self._filter.count,
+            "capacity": self.capacity,
+            "filter_bytes": len(self._filter._bits),
+            "lookups": self._lookups,
+            "confirmations": self._confirmations,
+            "false_positives": self._false_positives,
+            "refreshed_at": self._refreshed_at.isoformat() + "Z" if self._refreshed_at else None,
+        }
+
+
+# Initialize global instances
+token_cache = TokenCache(max_entries=settings.TOKEN_CACHE_MAX_ENTRIES)
+revocation_filter = RevocationFilter(
+    capacity=settings.REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+    refresh_seconds=settings.REVOCATION_FILTER_REFRESH_SECONDS,
+)
@@ -0,0 +1,257 @@
+"""
+Per-user in-memory vector index for user financial data
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+
+class _UserEntry:
+    """One user's vectors as a normalized matrix, plus documents and a BM25 index"""
+
+    def __init__(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]], dtype=np.float32):
+        self.lock = threading.Lock()
+        self.dtype = dtype
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas else [{} for _ in self.ids]
+        self.positions = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.matrix = _normalize(embeddings, len(self.ids), dtype)
+
+        self.lexical = BM25Index()
+        self.lexical.add_many(zip(self.ids, self.documents))
+        self._update_size()
+
+    def _update_size(self):
+        # Rough footprint: vectors, document text (twice, counting the
+        # lexical postings) and per-record overhead
+        self.nbytes = self.matrix.nbytes + 2 * sum(len(doc or "") for doc in self.documents) + 256 * len(self.ids)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace or append records in place"""
+        vectors = _normalize(embeddings, len(ids), self.dtype)
+        appended = []
+        for i, doc_id in enumerate(ids):
+            row = self.positions.get(doc_id)
+            if row is None:
+                appended.append(i)
+                continue
+            self.matrix[row] = vectors[i]
+            self.documents[row] = documents[i]
+            self.metadatas[row] = metadatas[i]
+            self.lexical.add(doc_id, documents[i])
+
+        if appended:
+            new_rows = vectors[appended]
+            self.matrix = np.vstack([self.matrix, new_rows]) if len(self.ids) else new_rows
+            for i in appended:
+                self.positions[ids[i]] = len(self.ids)
+                self.ids.append(ids[i])
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+                self.lexical.add(ids[i], documents[i])
+        self._update_size()
+
+    def delete(self, ids: List[str]):
+        """Remove records in place"""
+        doomed = {doc_id for doc_id in ids if doc_id in self.positions}
+        if not doomed:
+            return
+        keep = [row for row, doc_id in enumerate(self.ids) if doc_id not in doomed]
+        self.matrix = self.matrix[keep] if keep else np.zeros((0, 0), dtype=self.dtype)
+        self.ids = [self.ids[row] for row in keep]
+        self.documents = [self.documents[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self.positions = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        for doc_id in doomed:
+            self.lexical.remove(doc_id)
+        self._update_size()
+
+
+def _normalize(embeddings, count: int, dtype=np.float32) -> np.ndarray:
+    """Row-normalized matrix of ``dtype`` (empty when there are no rows)"""
+    if not count:
+        return np.zeros((0, 0), dtype=dtype)
+    matrix = np.array(embeddings, dtype=np.float32).reshape(count, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(dtype, copy=False)
+
+
+class UserVectorIndex:
+    """LRU cache of per-user vector matrices with exact top-k search.
+
+    Each user has at most a few thousand records, so a dot product over
+    that user's normalized matrix is faster than a filtered HNSW query on
+    the shared collection, and its recall is exact. Each entry also keeps
+    a BM25 index over the same documents for hybrid retrieval. Entries
+    load on demand from Chroma. The least recently used users are evicted
+    to keep the total under ``max_bytes``. Writes update a cached entry in
+    place. With ``dtype=np.float16`` matrices take half the memory.
+    """
+
+    def __init__(self, collection_getter: Callable[[], Any], max_bytes: int = 256 * 1024 * 1024, dtype=np.float32):
+        self._collection_getter = collection_getter
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self._entries: "OrderedDict[str, _UserEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Bumped on invalidation so a load that raced with a write is not cached
+        self._epoch = 0
+        self._user_versions: Dict[str, int] = {}
+
+        # Stats
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+
+    def _load(self, user_id: str) -> _UserEntry:
+        started = time.perf_counter()
+        records = self._collection_getter().get(
+            where={"user_id": user_id},
+            include=["embeddings", "documents", "metadatas"]
+        )
+        entry = _UserEntry(
+            records["ids"],
+            records["embeddings"],
+            records["documents"] or [],
+            records["metadatas"] or [],
+            self.dtype
+        )
+        self._load_seconds += time.perf_counter() - started
+        return entry
+
+    def _get_entry(self, user_id: str) -> _UserEntry:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return entry
+            self._misses += 1
+            version = (self._epoch, self._user_versions.get(user_id, 0))
+
+        entry = self._load(user_id)
+
+        with self._lock:
+            current = (self._epoch, self._user_versions.get(user_id, 0))
+            if current == version and user_id not in self._entries and entry.nbytes <= self.max_bytes:
+                self._entries[user_id] = entry
+                self._total_bytes += entry.nbytes
+                while self._total_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total_bytes -= evicted.nbytes
+                    self._evictions += 1
+        return entry
+
+    def search(self, user_id: str, query_embedding, limit: int = 5, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top-k over one user's records (blocking; run in a thread).
+
+        Exact cosine ranking, fused with BM25 ranking by reciprocal rank
+        when ``query_text`` is given.
+        """
+        entry = self._get_entry(user_id)
+
+        with entry.lock:
+            if not entry.ids:
+                return []
+
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+            # float16 matrices are widened per search; storage stays compact
+            scores = entry.matrix.astype(np.float32, copy=False) @ query
+
+            # Rank a wider candidate pool when fusing with lexical results
+            pool = limit * 4 if query_text else limit
+            k = min(pool, len(entry.ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            if query_text:
+                vector_ranking = [entry.ids[i] for i in top]
+                lexical_ranking = [doc_id for doc_id, _ in entry.lexical.search(query_text, pool)]
+                rows = [
+                    entry.positions[doc_id]
+                    for doc_id, _ in reciprocal_rank_fusion([vector_ranking, lexical_ranking], limit=limit)
+                ]
+            else:
+                rows = list(top)
+
+            return [
+                {
+                    "id": entry.ids[i],
+                    "content": entry.documents[i],
+                    "metadata": entry.metadatas[i],
+                    "distance": float(1.0 - scores[i])
+                }
+                for i in rows
+            ]
+
+    def apply_upserts(self, user_id: str, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Apply upserted records to a cached user in place"""
+        self._apply(user_id, lambda entry: entry.upsert(ids, embeddings, documents, metadatas))
+
+    def apply_deletes(self, user_id: str, ids: List[str]):
+        """Apply deleted records to a cached user in place"""
+        self._apply(user_id, lambda entry: entry.delete(ids))
+
+    def _apply(self, user_id: str, change: Callable[[_UserEntry], None]):
+        with self._lock:
+            # A load in flight may predate this write, so it must not be cached
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+        try:
+            with entry.lock:
+                before = entry.nbytes
+                change(entry)
+                after = entry.nbytes
+        except Exception as e:
+            logger.warning(f"Dropping cached index for user {user_id} after failed update: {e}")
+            self.invalidate(user_id)
+            return
+        with self._lock:
+            if self._entries.get(user_id) is entry:
+                self._total_bytes += after - before
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop a user's cached vectors (or every user's when user_id is None)"""
+        with self._lock:
+            if user_id is None:
+                self._epoch += 1
+                self._entries.clear()
+                self._total_bytes = 0
+                return
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            entry = self._entries.pop(user_id, None)
+            if entry is not None:
+                self._total_bytes -= entry.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "users_cached": len(self._entries),
+                "bytes_cached": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "dtype": np.dtype(self.dtype).name,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+                "evictions": self._evictions,
+                "avg_load_ms": round(self._load_seconds / self._misses * 1000, 2) if self._misses else 0,
+            }
@@ -2,7 +2,7 @@
 Utility functions for Finance AI API
 """
 from datetime import datetime, date, time
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 from enum import Enum
 
 def date_to_datetime(date_obj: date) -> datetime:
@@ -82,3 +82,11 @@ def prepare_document_for_vector_store(doc: Dict[str, Any]) -> Dict[str, Any]:
             # Convert other types to string
             prepared_doc[key] = str(value)
     return prepared_doc
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Nearest-rank percentile of a collection of samples (0 when empty)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
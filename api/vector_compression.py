@@ -0,0 +1,147 @@
+"""
+Compact storage for user data vectors: float16 in memory or PCA-reduced dimensions
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORAGE_MODES = ("float32", "float16", "pca")
+
+SOURCE_USER_COLLECTION = "user_financial_data"
+
+
+def user_collection_name(storage: str, pca_dims: int) -> str:
+    """Chroma collection holding user vectors in the given storage mode.
+
+    PCA-reduced vectors live in their own collection because a Chroma
+    collection has a single dimensionality.
+    """
+    if storage == "pca":
+        return f"{SOURCE_USER_COLLECTION}_pca{pca_dims}"
+    return SOURCE_USER_COLLECTION
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class PCAProjection:
+    """Linear projection onto the top principal components of a corpus.
+
+    Projected vectors are re-normalized, so documents and queries are
+    compared by cosine similarity in the reduced space, as in the full one.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+
+    @property
+    def dims(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def source_dims(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, vectors, dims: int) -> "PCAProjection":
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if dims >= matrix.shape[1]:
+            raise ValueError(f"PCA dims ({dims}) must be below the embedding size ({matrix.shape[1]})")
+        if len(matrix) < dims:
+            raise ValueError(f"Need at least {dims} vectors to fit {dims} components, got {len(matrix)}")
+        mean = matrix.mean(axis=0)
+        _, _, components = np.linalg.svd(matrix - mean, full_matrices=False)
+        return cls(mean, components[:dims])
+
+    def transform(self, vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self.source_dims)
+        return _normalize_rows((matrix - self.mean) @ self.components.T)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path: str) -> "PCAProjection":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"])
+
+
+async def compress_user_vectors(
+    vector_store,
+    dims: int,
+    path: str,
+    sample_size: int = 20000,
+    page_size: int = 1000,
+) -> Dict[str, Any]:
+    """Fit a PCA projection on the stored user vectors and write the
+    projected copies to the reduced-dimension collection.
+
+    The full-size collection is left untouched, so switching
+    USER_VECTOR_STORAGE back to float32 needs no migration.
+    """
+    await vector_store.ensure_loaded(llm=False)
+    client = vector_store.client
+    source = await asyncio.to_thread(client.get_or_create_collection, name=SOURCE_USER_COLLECTION)
+
+    # Fit on a sample of the existing corpus
+    started = time.perf_counter()
+    sample = []
+    offset = 0
+    while len(sample) < sample_size:
+        page = await asyncio.to_thread(
+            source.get, include=["embeddings"], limit=min(page_size, sample_size - len(sample)), offset=offset
+        )
+        if not page["ids"]:
+            break
+        sample.extend(page["embeddings"])
+        offset += len(page["ids"])
+
+    projection = PCAProjection.fit(sample, dims)
+    projection.save(path)
+    full = np.asarray(sample, dtype=np.float32) - projection.mean
+    explained = float(np.sum((full @ projection.components.T) ** 2) / np.sum(full ** 2))
+    logger.info(f"Fitted {dims}-dim PCA on {len(sample)} vectors ({explained:.1%} variance kept): {path}")
+
+    # Rewrite every vector in the reduced space
+    target_name = user_collection_name("pca", dims)
+    try:
+        await asyncio.to_thread(client.delete_collection, target_name)
+    except Exception:
+        pass
+    target = await asyncio.to_thread(
+        client.get_or_create_collection,
+        name=target_name,
+        metadata={"description": f"User personal financial data ({dims}-dim PCA)"}
+    )
+
+    written = 0
+    offset = 0
+    while True:
+        page = await asyncio.to_thread(
+            source.get, include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+        )
+        if not page["ids"]:
+            break
+        await asyncio.to_thread(
+            target.upsert,
+            ids=page["ids"],
+            embeddings=projection.transform(page["embeddings"]).tolist(),
+            documents=page["documents"],
+            metadatas=page["metadatas"]
+        )
+        written += len(page["ids"])
+        offset += len(page["ids"])
+
+    logger.info(f"Wrote {written} vectors to {target_name} in {time.perf_counter() - started:.1f}s")
+    return {"dims": dims, "fitted_on": len(sample), "variance_kept": round(explained, 4), "written": written}